@@ -0,0 +1,20 @@
+"""Atomic file replacement shared by the pipeline, bundle builder and graph CLI.
+
+Kept free of heavy imports so the static-site scripts do not pull in the
+classification stack just to write a file.
+"""
+import os
+import tempfile
+
+
+def write_atomic(path, write, mode='w'):
+    """Write a file via a temp file in the same directory and rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, mode, newline=None if 'b' in mode else '') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,142 @@
+"""Benchmark dashboard data loading: CSV vs columnar Parquet.
+
+Builds synthetic classification outputs at 1x, 10x and 100x the current row
+count, then loads each one in a fresh interpreter (cold start) the way the
+dashboard does:
+
+- csv:      pd.read_csv of every column (the previous load_data)
+- parquet:  load_classifications() - projected columns, categorical dtypes
+- parquet+explanations: the above plus the lazily loaded explanation columns
+
+and reports load time and resident memory added by the load.
+
+    python benchmark_data_loading.py --scales 1 10 100
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from classification_store import write_parquet
+from material_classifier import keyword_entries
+
+BASE_ROWS = 773
+
+_LOADERS = {
+    'csv': "import pandas as pd; df = pd.read_csv(PATH + '.csv')",
+    'parquet': "from classification_store import load_classifications; "
+               "df = load_classifications(csv_path=PATH + '.csv')",
+    'parquet+explanations': "from classification_store import load_classifications, load_explanations; "
+                            "df = load_classifications(csv_path=PATH + '.csv'); "
+                            "df = df.join(load_explanations(csv_path=PATH + '.csv'))",
+}
+
+_MEASURE = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+import pandas as pd, pyarrow.parquet  # library import cost is excluded from both loaders
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * {page_size} / 2**20
+
+PATH = {path!r}
+before = rss_mb()
+start = time.perf_counter()
+{loader}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_mb() - before,
+                   'frame_mb': df.memory_usage(deep=True).sum() / 2**20, 'rows': len(df)}}))
+"""
+
+
+def synthetic_classifications(n_rows, data_dir='docs/data', seed=0):
+    """Classification output with realistic titles, faculty names and explanations"""
+    rng = np.random.default_rng(seed)
+    titles, faculty = [], []
+    for profile_path in sorted(glob.glob(os.path.join(data_dir, '*', 'profile.json'))):
+        with open(profile_path) as f:
+            faculty.append(json.load(f)['name'])
+        publications_path = os.path.join(os.path.dirname(profile_path), 'publications.json')
+        if os.path.exists(publications_path):
+            with open(publications_path) as f:
+                titles.extend(pub['title'] for pub in json.load(f) if pub.get('title'))
+
+    categories = ['semiconductor', 'metal', 'others', 'ceramic', 'nano_materials', 'polymer', 'composite', 'biopolymer']
+    weights = np.array([176, 160, 118, 95, 84, 64, 38, 37], dtype=float)
+    category = rng.choice(categories, n_rows, p=weights / weights.sum())
+    method = rng.choice(['Rule-Based', 'OpenAI'], n_rows, p=[0.44, 0.56])
+    confidence = rng.uniform(0.4, 1.0, n_rows).astype('float32')
+    rule_based = method == 'Rule-Based'
+    n_keywords = len(keyword_entries())
+    keyword_ids = [' '.join(map(str, sorted(rng.choice(n_keywords, rng.integers(1, 5), replace=False)))) if rule else ''
+                   for rule in rule_based]
+    reason = np.where(
+        rule_based, None,
+        [f"The publication discusses {k} materials and their processing, "
+         f"which places it in the {k} category." for k in category])
+
+    return pd.DataFrame({
+        'publication_id': np.arange(1, n_rows + 1),
+        'Faculty': rng.choice(faculty, n_rows),
+        'Title': [titles[i] for i in rng.integers(0, len(titles), n_rows)],
+        'Year': rng.integers(2021, 2026, n_rows),
+        'Category': category,
+        'Method': method,
+        'Confidence': confidence,
+        'Keyword IDs': keyword_ids,
+        'Reason': reason,
+    })
+
+
+def measure(path, loader):
+    script = _MEASURE.format(repo=os.path.dirname(os.path.abspath(__file__)),
+                             page_size=os.sysconf('SC_PAGE_SIZE'), path=path, loader=_LOADERS[loader])
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs Parquet dashboard load benchmark")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3, help="Cold starts per measurement (best is reported)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            n_rows = BASE_ROWS * scale
+            path = os.path.join(tmp, f'classifications_{scale}x')
+            df = synthetic_classifications(n_rows)
+            df.to_csv(path + '.csv', index=False)
+            write_parquet(df, path + '.parquet')
+            sizes = {'csv': os.path.getsize(path + '.csv'), 'parquet': os.path.getsize(path + '.parquet')}
+
+            for loader in _LOADERS:
+                runs = [measure(path, loader) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['seconds'])
+                best['rss_mb'] = min(r['rss_mb'] for r in runs)
+                best.update(scale=scale, loader=loader,
+                            file_mb=sizes[loader.split('+')[0]] / 2**20)
+                results.append(best)
+                print(f"  ✅ {scale:>4}x {loader:<22} {best['seconds'] * 1000:8.1f} ms  "
+                      f"RSS +{best['rss_mb']:7.1f} MB  frame {best['frame_mb']:7.1f} MB  "
+                      f"file {best['file_mb']:6.1f} MB")
+
+    print(f"\n{'='*60}")
+    print("📊 Cold-start load summary")
+    print(f"{'='*60}")
+    summary = pd.DataFrame(results)[['scale', 'rows', 'loader', 'seconds', 'rss_mb', 'frame_mb', 'file_mb']]
+    summary['seconds'] = (summary['seconds'] * 1000).round(1)
+    summary = summary.rename(columns={'seconds': 'load_ms'}).round(1)
+    print(summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark the classification pipeline's hot paths on synthetic corpora.
+
+Each benchmark runs on 1k, 10k and 100k synthetic publications built from the
+titles in docs/data:
+
+- prepare_text:         prepare_frame() (prepare_text + clean_text per row)
+- classify_rule_based:  the scalar classifier called once per text
+- classify_series:      the vectorized rule-based classifier
+- *_pool:               the same two stages sharded over a ShardPool
+                        (only with --workers)
+- hybrid:               classify_hybrid() with a fresh in-memory cache and the
+                        generative tier served by the local stub server
+- dashboard:            Parquet load + DashboardData + a filtered aggregation
+
+    python benchmark_pipeline.py --sizes 1000 10000 100000 --json bench.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_data_loading import synthetic_classifications
+from chat_stub_server import start_stub_server
+from classification_cache import ClassificationCache
+from classification_store import load_classifications, write_parquet
+from classify_publications import classify_hybrid, prepare_frame
+from dashboard_data import DashboardData, counts_by, faculty_summary, slice_cube, unique_cube
+from generative_classifier import GenerativeClassifier
+from material_classifier import MATERIAL_KEYWORDS, classify_rule_based, classify_series
+from parallel_classify import ShardPool
+
+GENERIC_KEYWORDS = ['characterization', 'modeling', 'thin film', 'microstructure', 'simulation',
+                    'mechanical properties', 'synthesis', 'spectroscopy', 'machine learning']
+
+
+def synthetic_publications(n_rows, data_dir='docs/data', seed=0):
+    """Rows shaped like the TIER 1 query result (title, keywords, journal, ...)"""
+    rng = np.random.default_rng(seed)
+    classified = synthetic_classifications(n_rows, data_dir, seed)
+    material_keywords = sorted({kw for keywords in MATERIAL_KEYWORDS.values() for kw in keywords})
+    vocabulary = np.array(material_keywords + GENERIC_KEYWORDS, dtype=object)
+
+    keywords = []
+    for n_keywords in rng.integers(0, 5, n_rows):
+        # About a third of publications come without keywords, as in the database
+        keywords.append(json.dumps(list(rng.choice(vocabulary, n_keywords, replace=False))) if n_keywords > 1 else '')
+
+    return pd.DataFrame({
+        'publication_id': classified['publication_id'],
+        'title': classified['Title'],
+        'year': classified['Year'],
+        'keywords': keywords,
+        'faculty_name': classified['Faculty'],
+        'journal_name': 'Journal of Materials Research',
+    })
+
+
+def best_of(repeat, setup, func):
+    """Fastest of `repeat` runs; setup() builds fresh inputs outside the timing"""
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmarks(n_rows, repeat, stub_url, batch_size, tmp_dir, pool=None):
+    raw = synthetic_publications(n_rows)
+    prepared = prepare_frame(raw.copy())
+    texts = prepared['text_for_classification']
+
+    def hybrid_setup():
+        engine = GenerativeClassifier(api_key='stub', base_url=stub_url, concurrency=16,
+                                      batch_size=batch_size, backoff=0.1)
+        return prepared.copy(), ClassificationCache(':memory:'), engine
+
+    def hybrid(df, cache, engine):
+        classify_hybrid(df, cache, engine)
+        cache.close()
+        hybrid.api_calls, hybrid.retries = engine.stats['api_calls'], engine.stats['retries']
+
+    parquet_path = os.path.join(tmp_dir, f'classifications_{n_rows}.parquet')
+    classified = synthetic_classifications(n_rows)
+    write_parquet(classified, parquet_path)
+    years = sorted(classified['Year'].unique())[-3:]
+
+    def dashboard():
+        data = DashboardData(load_classifications(parquet_path=parquet_path))
+        cube = unique_cube(data, years=years, faculties=data.faculties[::2])
+        counts_by(cube, 'Category')
+        counts_by(cube, ['Year', 'Category'])
+        faculty_summary(slice_cube(data.cube, years=years))
+
+    results = {
+        'prepare_text': best_of(repeat, lambda: (raw.copy(),), prepare_frame),
+        'classify_rule_based': best_of(repeat, lambda: (), lambda: [classify_rule_based(t) for t in texts]),
+        'classify_series': best_of(repeat, lambda: (), lambda: classify_series(texts)),
+        'hybrid': best_of(repeat, hybrid_setup, hybrid),
+        'dashboard': best_of(repeat, lambda: (), dashboard),
+    }
+    if pool is not None:
+        results['prepare_text_pool'] = best_of(repeat, lambda: (raw.copy(),), lambda df: prepare_frame(df, pool))
+        results['classify_series_pool'] = best_of(repeat, lambda: (), lambda: pool.classify_series(texts))
+    return [{'rows': n_rows, 'benchmark': name, 'seconds': seconds, 'rows_per_s': n_rows / seconds,
+             'api_calls': hybrid.api_calls if name == 'hybrid' else None,
+             'retries': hybrid.retries if name == 'hybrid' else None}
+            for name, seconds in results.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classification pipeline hot-path benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark (best is reported)")
+    parser.add_argument('--batch-size', type=int, default=20, help="Publications per stub API call")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="Stub response latency in seconds")
+    parser.add_argument('--workers', type=int, help="Also benchmark the process-pool stages (0 = all cores)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.stub_latency)
+    stub_url = f'http://127.0.0.1:{server.server_port}/v1'
+    pool = ShardPool(args.workers or None) if args.workers is not None else None
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for n_rows in args.sizes:
+                for result in run_benchmarks(n_rows, args.repeat, stub_url, args.batch_size, tmp, pool):
+                    results.append(result)
+                    print(f"  ✅ {n_rows:>7,} {result['benchmark']:<20} {result['seconds'] * 1000:10.1f} ms  "
+                          f"{result['rows_per_s']:12,.0f} rows/s")
+    finally:
+        server.shutdown()
+        if pool is not None:
+            pool.close()
+
+    print(f"\n{'='*60}")
+    print("📊 Pipeline benchmark summary")
+    print(f"{'='*60}")
+    summary = pd.DataFrame(results)
+    summary['ms'] = (summary.pop('seconds') * 1000).round(1)
+    summary['rows_per_s'] = summary['rows_per_s'].round(0).astype(int)
+    print(summary.pivot(index='benchmark', columns='rows', values='ms').to_string())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
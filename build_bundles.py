@@ -0,0 +1,223 @@
+"""Build one compact, pre-compressed data bundle per faculty for the docs/ site.
+
+A faculty page used to fetch profile.json, publications.json, categories.json
+and coi_stats.json separately, and categories.json repeats DOIs already listed
+in publications.json. This script packs the four files into a single bundle:
+
+- DOIs, journals and author names are interned into string tables
+- publications are stored column-wise, referencing those tables by index
+- category membership is a list of DOI indices instead of DOI strings
+
+Bundles are written as docs/data/bundles/<unity_id>.<content hash>.json with
+.gz (and .br, when the brotli package is installed) variants next to them, so
+they can be cached forever; docs/data/manifest.json maps each faculty to its
+current bundle and is the only file that has to be revalidated.
+
+Builds are incremental: the manifest also records a hash of each faculty's
+source files, and only faculty whose inputs changed (or whose bundle is
+missing) are rebuilt, in parallel across processes. Faculty with only some of
+the source files (e.g. profile and publications only) hash and bundle what
+they have.
+
+    python build_bundles.py --workers 0
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_files import write_atomic
+
+DATA_DIR = 'docs/data'
+BUNDLE_DIR = 'bundles'
+MANIFEST = 'manifest.json'
+BUNDLE_VERSION = 1
+SOURCE_FILES = ['profile', 'publications', 'categories', 'coi_stats']
+
+
+class StringTable:
+    """Index of each distinct string, in order of first appearance"""
+
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, value):
+        return self.index.setdefault(value, len(self.index))
+
+    def values(self):
+        return list(self.index)
+
+
+def load_faculty(faculty_dir):
+    """The faculty's source JSON files; missing ones are None"""
+    data = {}
+    for name in SOURCE_FILES:
+        path = os.path.join(faculty_dir, f'{name}.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                data[name] = json.load(f)
+        else:
+            data[name] = None
+    return data
+
+
+def input_digest(faculty_dir):
+    """Hash of the faculty's source files; missing files hash differently from empty ones"""
+    digest = hashlib.sha256(f'bundle-v{BUNDLE_VERSION}'.encode())
+    for name in SOURCE_FILES:
+        path = os.path.join(faculty_dir, f'{name}.json')
+        digest.update(name.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        else:
+            digest.update(b'missing')
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(data_dir=DATA_DIR):
+    """Manifest of the previous build, or an empty one"""
+    path = os.path.join(data_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == BUNDLE_VERSION:
+            return manifest
+    return {'version': BUNDLE_VERSION, 'bundles': {}, 'inputs': {}}
+
+
+def make_bundle(data):
+    """Single-document form of a faculty's data with DOIs, journals and authors interned"""
+    dois, journals, authors = StringTable(), StringTable(), StringTable()
+    publications = data['publications'] or []
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'profile': data['profile'],
+        'publications': {
+            'doi': [dois(p['doi']) for p in publications],
+            'title': [p['title'] for p in publications],
+            'year': [p['year'] for p in publications],
+            'journal': [journals(p['journal']) for p in publications],
+            'authors': [[authors(a) for a in p['authors']] for p in publications],
+            'citation_count': [p['citation_count'] for p in publications],
+        },
+        'categories': None,
+        'coi_stats': data['coi_stats'],
+    }
+    if data['categories'] is not None:
+        categories = dict(data['categories'])
+        categories['categories'] = [dict(c, papers=[dois(doi) for doi in c['papers']])
+                                    for c in categories['categories']]
+        bundle['categories'] = categories
+    # Filled in last: categories may reference papers beyond the publication list
+    bundle['dois'] = dois.values()
+    bundle['journals'] = journals.values()
+    bundle['authors'] = authors.values()
+    return bundle
+
+
+def encode(bundle):
+    return json.dumps(bundle, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def compressed_variants(payload):
+    """Extension -> pre-compressed payload; .br only when brotli is installed"""
+    # mtime=0 keeps the .gz byte-identical between builds of the same bundle
+    variants = {'.gz': gzip.compress(payload, compresslevel=9, mtime=0)}
+    if importlib.util.find_spec('brotli') is not None:
+        import brotli
+        variants['.br'] = brotli.compress(payload, quality=11)
+    return variants
+
+
+def write_bundle(unity_id, payload, bundle_dir):
+    """Write the bundle and its compressed variants; returns the bundle file name"""
+    digest = hashlib.sha256(payload).hexdigest()[:12]
+    name = f'{unity_id}.{digest}.json'
+    path = os.path.join(bundle_dir, name)
+    if not os.path.exists(path):
+        for ext, data in compressed_variants(payload).items():
+            write_atomic(path + ext, lambda f, data=data: f.write(data), mode='wb')
+        write_atomic(path, lambda f: f.write(payload), mode='wb')
+
+    # Bundles of earlier builds are no longer referenced by the manifest
+    for stale in glob.glob(os.path.join(bundle_dir, f'{unity_id}.*.json*')):
+        if not os.path.basename(stale).startswith(name):
+            os.remove(stale)
+    return name
+
+
+def build_faculty(unity_id, faculty_dir, bundle_dir):
+    """Bundle one faculty; returns (bundle file name, source bytes, bundle bytes)"""
+    data = load_faculty(faculty_dir)
+    payload = encode(make_bundle(data))
+    source = sum(os.path.getsize(os.path.join(faculty_dir, f'{name}.json'))
+                 for name in SOURCE_FILES if data[name] is not None)
+    return write_bundle(unity_id, payload, bundle_dir), source, len(payload)
+
+
+def build_bundles(data_dir=DATA_DIR, workers=1, force=False):
+    """Rebuild the bundles whose inputs changed; returns the manifest and build totals"""
+    bundle_dir = os.path.join(data_dir, BUNDLE_DIR)
+    os.makedirs(bundle_dir, exist_ok=True)
+    with open(os.path.join(data_dir, 'faculty_list.json')) as f:
+        faculty_list = json.load(f)
+
+    previous = load_manifest(data_dir)
+    manifest = {'version': BUNDLE_VERSION, 'bundles': {}, 'inputs': {}}
+    pending = []
+    for faculty in faculty_list:
+        unity_id = faculty['unity_id']
+        faculty_dir = os.path.join(data_dir, unity_id)
+        if not os.path.isdir(faculty_dir):
+            print(f"   ⚠️ {unity_id}: no data directory, skipped")
+            continue
+        digest = input_digest(faculty_dir)
+        manifest['inputs'][unity_id] = digest
+        bundle = previous['bundles'].get(unity_id)
+        if (not force and previous.get('inputs', {}).get(unity_id) == digest
+                and bundle and os.path.exists(os.path.join(data_dir, bundle))):
+            manifest['bundles'][unity_id] = bundle
+        else:
+            pending.append((unity_id, faculty_dir))
+
+    totals = {'built': len(pending), 'skipped': len(manifest['bundles']), 'source': 0, 'bundle': 0}
+    ids = [unity_id for unity_id, _ in pending]
+    dirs = [faculty_dir for _, faculty_dir in pending]
+    if workers != 1 and len(pending) > 1:
+        with ProcessPoolExecutor(workers or None) as executor:
+            results = list(executor.map(build_faculty, ids, dirs, [bundle_dir] * len(pending)))
+    else:
+        results = [build_faculty(unity_id, faculty_dir, bundle_dir) for unity_id, faculty_dir in pending]
+    for unity_id, (name, source, size) in zip(ids, results):
+        manifest['bundles'][unity_id] = f'{BUNDLE_DIR}/{name}'
+        totals['source'] += source
+        totals['bundle'] += size
+
+    write_atomic(os.path.join(data_dir, MANIFEST), lambda f: json.dump(manifest, f, indent=2, sort_keys=True))
+    return manifest, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-faculty data bundles for the docs/ site")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Directory holding faculty_list.json and <unity_id>/")
+    parser.add_argument('--workers', type=int, default=1, help="Processes for changed faculty (0 = all cores)")
+    parser.add_argument('--force', action='store_true', help="Rebuild every bundle, even if its inputs are unchanged")
+    args = parser.parse_args()
+
+    manifest, totals = build_bundles(args.data_dir, args.workers, args.force)
+    print(f"✅ {totals['built']} bundles rebuilt, {totals['skipped']} unchanged "
+          f"({os.path.join(args.data_dir, BUNDLE_DIR)})")
+    if totals['built']:
+        print(f"📊 {totals['source'] / 1024:.0f} KB of source JSON -> {totals['bundle'] / 1024:.0f} KB bundled")
+    if importlib.util.find_spec('brotli') is None:
+        print("   (install brotli to also write .br variants)")
+    print(f"💾 Manifest written to {os.path.join(args.data_dir, MANIFEST)}")
+
+
+if __name__ == '__main__':
+    main()
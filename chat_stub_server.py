@@ -0,0 +1,137 @@
+"""Local stand-in for the OpenAI chat-completions endpoint.
+
+Answers POST /v1/chat/completions in the Category/Confidence/Reason format the
+classification prompts ask for (using the rule-based classifier to pick a
+category), so the generative engine can be exercised offline. Latency and
+injected 429/500 failures are configurable; GET /stats reports request counts
+and the peak number of requests in flight.
+
+    python chat_stub_server.py --port 8001 --latency 0.2 --fail-every 10
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from material_classifier import classify_rule_based, clean_text
+
+_QUOTED_ITEM = re.compile(r'^(?:Item (\d+)|Publication): "(.*)"$', re.MULTILINE)
+
+
+def _answer(text):
+    category, confidence, _ = classify_rule_based(clean_text(text))
+    confidence = confidence if category != 'others' else 0.6
+    return (f"Category: {category}\n"
+            f"Confidence: {confidence * 100:.0f}\n"
+            f"Reason: Stub classification of the publication text.")
+
+
+def build_reply(prompt):
+    """Reply text for a single or batched classification prompt"""
+    items = _QUOTED_ITEM.findall(prompt)
+    if len(items) == 1 and not items[0][0]:
+        return _answer(items[0][1])
+    return '\n\n'.join(f"Item: {number}\n{_answer(text)}" for number, text in items)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops bursts of concurrent connects (1s SYN retry)
+    request_queue_size = 128
+
+    def __init__(self, address, latency=0.0, fail_every=0, fail_status=429):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.stats = {'requests': 0, 'failures': 0, 'in_flight': 0, 'max_in_flight': 0}
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            with self.server.lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        server = self.server
+        with server.lock:
+            server.stats['requests'] += 1
+            request_number = server.stats['requests']
+            server.stats['in_flight'] += 1
+            server.stats['max_in_flight'] = max(server.stats['max_in_flight'], server.stats['in_flight'])
+        try:
+            time.sleep(server.latency)
+            if server.fail_every and request_number % server.fail_every == 0:
+                with server.lock:
+                    server.stats['failures'] += 1
+                self._send_json(server.fail_status, {'error': {'message': 'stub injected failure'}},
+                                headers={'Retry-After': '0'})
+                return
+
+            prompt = payload['messages'][-1]['content']
+            reply = build_reply(prompt)
+            self._send_json(200, {
+                'id': f'stub-{request_number}',
+                'object': 'chat.completion',
+                'model': payload.get('model', 'stub'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': reply}}],
+                'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(reply) // 4,
+                          'total_tokens': (len(prompt) + len(reply)) // 4}
+            })
+        finally:
+            with server.lock:
+                server.stats['in_flight'] -= 1
+
+
+def start_stub_server(port=0, latency=0.0, fail_every=0, fail_status=429):
+    """Start the stub on a background thread; call .shutdown() when done"""
+    server = StubServer(('127.0.0.1', port), latency, fail_every, fail_status)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub chat-completions server")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds to wait before answering")
+    parser.add_argument('--fail-every', type=int, default=0, help="Fail every Nth request")
+    parser.add_argument('--fail-status', type=int, default=429)
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', args.port), args.latency, args.fail_every, args.fail_status)
+    print(f"🛰️  Stub chat-completions server on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Persistent content-addressed cache for classification results.
+
+Results are stored in SQLite, keyed by a hash of the normalized
+text_for_classification plus a per-method version:
+
+- rule_based: keyword dictionary version and confidence threshold
+- generative: model name and prompt templates
+
+Editing the keyword dictionary therefore only invalidates rule-based entries,
+and a re-run only pays for publications whose text actually changed. Entries
+written under an older version are purged when the cache is opened for the
+current one.
+
+Rule-based entries also keep the raw per-category scores and the best
+category's keyword ids (the `details` column), so a cached text is never
+matched against the dictionary again.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+
+import pandas as pd
+
+from material_classifier import MATERIAL_KEYWORDS, classify_series, keywords_version
+
+DEFAULT_CACHE_PATH = 'classification_cache.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    method      TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    confidence  REAL NOT NULL,
+    explanation TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    details     TEXT,
+    PRIMARY KEY (method, key)
+);
+CREATE INDEX IF NOT EXISTS results_version ON results (method, version);
+"""
+
+# SQLite caps the number of bound parameters per statement
+_CHUNK = 500
+
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of a text used for hashing"""
+    return ' '.join(str(text).lower().split())
+
+
+def text_key(text, version):
+    """Content address of a text under a given method version"""
+    payload = f'{version}\x1f{normalize_text(text)}'
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def rule_based_version(threshold=0.4, matcher=None):
+    """Cache version for rule-based results"""
+    version = matcher.version if matcher else keywords_version()
+    return f'{version}:{threshold}'
+
+
+class ClassificationCache:
+    """SQLite store of (category, confidence, explanation) per method and text"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]
+        if 'details' not in columns:
+            # Caches written before details were stored; their entries count as misses
+            self.conn.execute("ALTER TABLE results ADD COLUMN details TEXT")
+        self.hits = {}
+        self.misses = {}
+        self._purged = set()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def purge_stale(self, method, version):
+        """Delete entries of `method` written under any other version; returns count"""
+        cursor = self.conn.execute(
+            "DELETE FROM results WHERE method = ? AND version != ?", (method, version))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def evict_older_than(self, days):
+        """Delete entries older than `days`; returns count"""
+        cursor = self.conn.execute(
+            "DELETE FROM results WHERE created_at < ?", (time.time() - days * 86400,))
+        self.conn.commit()
+        return cursor.rowcount
+
+    def get_many(self, method, version, texts, count=True, details=False):
+        """Look up texts; returns {position: (category, confidence, explanation)} for hits
+
+        With details, hits are (category, confidence, explanation, details) and
+        entries stored without details are treated as misses.
+        """
+        if (method, version) not in self._purged:
+            self.purge_stale(method, version)
+            self._purged.add((method, version))
+
+        keys = [text_key(text, version) for text in texts]
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _CHUNK):
+            chunk = unique_keys[start:start + _CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, category, confidence, explanation, details FROM results "
+                f"WHERE method = ? AND key IN ({placeholders})", [method] + chunk)
+            for key, category, confidence, explanation, stored in rows:
+                if not details:
+                    found[key] = (category, confidence, explanation)
+                elif stored is not None:
+                    found[key] = (category, confidence, explanation, json.loads(stored))
+
+        results = {i: found[key] for i, key in enumerate(keys) if key in found}
+        if count:
+            self.hits[method] = self.hits.get(method, 0) + len(results)
+            self.misses[method] = self.misses.get(method, 0) + len(keys) - len(results)
+        return results
+
+    def put_many(self, method, version, texts, results, details=None):
+        """Store results for texts (parallel sequences); details are JSON-serializable"""
+        now = time.time()
+        details = details if details is not None else [None] * len(texts)
+        rows = [(method, text_key(text, version), version, category, float(confidence), explanation, now,
+                 None if extra is None else json.dumps(extra, separators=(',', ':')))
+                for text, (category, confidence, explanation), extra in zip(texts, results, details)]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def stats(self):
+        """Hit/miss counters per method plus stored entry counts"""
+        stored = dict(self.conn.execute("SELECT method, COUNT(*) FROM results GROUP BY method"))
+        methods = sorted(set(self.hits) | set(self.misses) | set(stored))
+        return {method: {'hits': self.hits.get(method, 0),
+                         'misses': self.misses.get(method, 0),
+                         'stored': stored.get(method, 0)} for method in methods}
+
+
+def cached_classify_series(cache, texts, threshold=0.4, matcher=None, classify=None):
+    """classify_series(..., details=True) that only scores texts missing from the cache
+
+    `classify(texts, threshold, details)` replaces classify_series for the
+    misses (e.g. ShardPool.classify_series); it must use the same keywords as
+    `matcher`.
+    """
+    categories = matcher.categories if matcher else list(MATERIAL_KEYWORDS)
+    version = rule_based_version(threshold, matcher)
+    texts = pd.Series(texts)
+    found = cache.get_many('rule_based', version, texts, details=True)
+    missing = [i for i in range(len(texts)) if i not in found]
+
+    columns = ['category', 'confidence', 'explanation'] + categories + ['keyword_ids']
+    result = pd.DataFrame(index=texts.index, columns=columns, dtype=object)
+    if found:
+        positions = list(found)
+        result.iloc[positions] = [[category, confidence, explanation] + extra['scores'] + [extra['keyword_ids']]
+                                  for category, confidence, explanation, extra in (found[i] for i in positions)]
+    if missing:
+        if classify is None:
+            fresh = classify_series(texts.iloc[missing], threshold, matcher, details=True)
+        else:
+            fresh = classify(texts.iloc[missing], threshold, True)
+        fresh = fresh[columns]
+        result.iloc[missing] = fresh.values
+        scores = fresh[categories].to_numpy(dtype=float).tolist()
+        extras = [{'scores': row, 'keyword_ids': ids} for row, ids in zip(scores, fresh['keyword_ids'])]
+        cache.put_many('rule_based', version, texts.iloc[missing],
+                       fresh[['category', 'confidence', 'explanation']].itertuples(index=False), extras)
+    result['confidence'] = result['confidence'].astype(float)
+    result[categories] = result[categories].astype(float)
+    return result
+
+
+async def cached_classify_many(cache, engine, texts):
+    """GenerativeClassifier.classify_many that only calls the API for cache misses
+
+    Misses that normalize to the same text are sent once and the answer is
+    shared by every position holding them.
+    """
+    texts = list(texts)
+    found = cache.get_many('generative', engine.version, texts)
+    positions = {}
+    for i in range(len(texts)):
+        if i not in found:
+            positions.setdefault(normalize_text(texts[i]), []).append(i)
+    missing = [same[0] for same in positions.values()]
+
+    fresh = await engine.classify_many([texts[i] for i in missing])
+    # Failed calls are not cached so the next run retries them
+    ok = [(texts[i], result) for i, result in zip(missing, fresh)
+          if not result[2].startswith('API Error')]
+    if ok:
+        cache.put_many('generative', engine.version, [t for t, _ in ok], [r for _, r in ok])
+
+    results = dict(found)
+    for same, result in zip(positions.values(), fresh):
+        results.update((i, result) for i in same)
+    return [results[i] for i in range(len(texts))]
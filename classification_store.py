@@ -0,0 +1,358 @@
+"""Reading and writing the classification output consumed by the dashboard.
+
+The pipeline writes production_classifications.csv (for people) and
+production_classifications.parquet (for the dashboard). The Parquet copy keeps
+Faculty/Category/Method dictionary-encoded and Year as a small nullable int, and
+lets readers project only the columns they need.
+
+Explanations are stored as structured columns rather than formatted text: a
+float32 Confidence, the Keyword IDs of the matched dictionary keywords (a
+space-separated list in the CSV, list<int16> in Parquet), the Method and an
+interned Reason (the generative model's reason, or why rule-based scoring
+found nothing). render_explanations() turns them back into the familiar
+sentences, only for the rows a table actually shows.
+
+The dashboard reads through load_shared(): an uncompressed Arrow copy of the
+Parquet file (production_classifications.arrow) is memory-mapped and wrapped
+in pandas without copying the string and numeric columns, so every session and
+every server process shares the same page-cache pages instead of holding its
+own deserialized frame.
+"""
+import html
+import importlib.util
+import io
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CSV_PATH = 'production_classifications.csv'
+PARQUET_PATH = 'production_classifications.parquet'
+
+CONFIDENCE = 'Confidence'
+KEYWORD_IDS = 'Keyword IDs'
+REASON = 'Reason'
+# Search field holding the names of the matched keywords
+KEYWORDS = 'Keywords'
+EXPLANATION_COLUMNS = [CONFIDENCE, KEYWORD_IDS, REASON]
+
+# Method labels of the export, as a fixed enum (alphabetical, like the inferred categories were)
+METHODS = ['Local Model', 'OpenAI', 'Rule-Based']
+
+CATEGORICAL_COLUMNS = ['Faculty', 'Category', 'Journal', 'AI Category', REASON]
+DATA_COLUMNS = ['Faculty', 'Title', 'Year', 'Category', 'Method']
+SEARCH_COLUMNS = ['Title', REASON, 'Journal', 'Authors']
+
+# Keyword IDs are text (a column of single ids would otherwise parse as numbers) and
+# Confidence stays float32, so carried-over rows are written back unchanged
+CSV_DTYPES = {KEYWORD_IDS: str, CONFIDENCE: 'float32'}
+
+# Raw rule-based score per category ("Score metal", ...) and the cached generative label
+SCORE_PREFIX = 'Score '
+AI_CATEGORY = 'AI Category'
+
+_DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+_MARKUP = re.compile(r'<[^>]+>')
+_NON_WORD = re.compile(r'[\W_]+')
+
+# Download formats offered by the dashboard: label -> (extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def to_columnar(df):
+    """Cast the export columns to compact dtypes (categoricals, nullable Int16 year)"""
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if 'Method' in df.columns:
+        df['Method'] = df['Method'].astype(pd.CategoricalDtype(METHODS))
+    if 'Year' in df.columns:
+        # Nullable: an output written by other tools may hold undated rows
+        df['Year'] = df['Year'].astype('Int16')
+    for column in score_columns(df.columns) + [c for c in [CONFIDENCE] if c in df.columns]:
+        df[column] = df[column].astype('float32')
+    if KEYWORD_IDS in df.columns:
+        df[KEYWORD_IDS] = keyword_id_lists(df[KEYWORD_IDS])
+    return df
+
+
+def format_keyword_ids(ids):
+    """Keyword ids as written to the CSV output ("3 17 42")"""
+    return ' '.join(map(str, ids))
+
+
+def parse_keyword_ids(value):
+    """Keyword ids of one row: CSV text, a Parquet list or a missing value (no keywords)"""
+    if isinstance(value, str):
+        return [int(i) for i in value.split()]
+    if value is None or (isinstance(value, float) and value != value):
+        return []
+    return [int(i) for i in value]
+
+
+def keyword_id_lists(values):
+    """Keyword IDs column as int16 arrays (written to Parquet as list<int16>)"""
+    return pd.Series([np.array(parse_keyword_ids(value), dtype=np.int16) for value in values],
+                     index=values.index, dtype=object)
+
+
+def remap_keyword_ids(values, id_map):
+    """Rewrite CSV Keyword IDs through an old -> new id map (keyword_id_map), dropping removed keywords"""
+    return pd.Series([format_keyword_ids(id_map[i] for i in parse_keyword_ids(value) if id_map[i] >= 0)
+                      for value in values], index=values.index, dtype=object)
+
+
+def keyword_text(values, keyword_names):
+    """Space-joined names of each row's Keyword IDs, for the search index"""
+    return pd.Series([' '.join(keyword_names[i] for i in parse_keyword_ids(value)) for value in values],
+                     index=values.index, dtype=object)
+
+
+def render_explanations(rows, keyword_names):
+    """Human-readable explanation per row of Method, Category and the explanation columns.
+
+    keyword_names maps the Keyword IDs to the dictionary the output was scored
+    with. Rows of outputs written before the structured columns keep their
+    stored Explanation.
+    """
+    if CONFIDENCE not in rows.columns:
+        return rows['Explanation'].tolist() if 'Explanation' in rows.columns else [''] * len(rows)
+    texts = []
+    for method, category, confidence, keyword_ids, reason in zip(
+            rows['Method'], rows['Category'], rows[CONFIDENCE], rows[KEYWORD_IDS], rows[REASON]):
+        if method == 'Rule-Based':
+            ids = parse_keyword_ids(keyword_ids)
+            if not ids:
+                text = reason if isinstance(reason, str) else "No material keywords detected"
+            elif category == 'others':
+                text = f"Low confidence ({confidence:.1%}) - ambiguous material type"
+            else:
+                text = (f"Confidence: {confidence:.1%} | Found {len(ids)} keywords: "
+                        + ', '.join(keyword_names[i] for i in ids[:3]))
+        elif method == 'Local Model':
+            text = f"Local model: {confidence:.1%} {category}"
+        elif isinstance(reason, str):
+            text = reason if reason.startswith('API Error') else f"AI: {reason}"
+        else:
+            text = ''
+        texts.append(text)
+    return texts
+
+
+def normalize_doi(doi):
+    """Lower-cased bare DOI ("10.xxx/..."), or None when doi is not one"""
+    if not isinstance(doi, str):
+        return None
+    doi = _DOI_PREFIX.sub('', doi.strip()).lower()
+    return doi if doi.startswith('10.') else None
+
+
+def normalize_title(title):
+    """Title without markup, entities, case or punctuation ("LiFePO<sub>4</sub>" -> "lifepo4")"""
+    if not isinstance(title, str):
+        return ''
+    return _NON_WORD.sub(' ', html.unescape(_MARKUP.sub('', title)).lower()).strip()
+
+
+def publication_keys(dois, titles):
+    """Canonical publication key per row: the normalized DOI, else the normalized title"""
+    if dois is None:
+        dois = [None] * len(titles)
+    return [doi or 'title:' + normalize_title(title) for doi, title in zip(map(normalize_doi, dois), titles)]
+
+
+def score_columns(columns):
+    """The per-category score columns among `columns`"""
+    return [c for c in columns if c.startswith(SCORE_PREFIX)]
+
+
+def write_parquet(df, path):
+    """Write the export frame as Parquet with dictionary-encoded string columns"""
+    to_columnar(df).to_parquet(path, index=False)
+
+
+class ParquetChunkWriter:
+    """Append export frames to one Parquet file as they are produced.
+
+    Chunks carry their own categories, so dictionary columns are widened to
+    int32 indices to keep one schema for the whole file.
+    """
+
+    def __init__(self, path_or_file):
+        self.path_or_file = path_or_file
+        self.schema = None
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(to_columnar(df), preserve_index=False)
+        if self.writer is None:
+            self.schema = pa.schema(
+                [field.with_type(pa.dictionary(pa.int32(), pa.string()))
+                 if pa.types.is_dictionary(field.type) else field for field in table.schema],
+                metadata=table.schema.metadata)
+            self.writer = pq.ParquetWriter(self.path_or_file, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def parquet_path_for(csv_path):
+    """Parquet file written alongside a CSV output"""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def parquet_is_current(csv_path, parquet_path):
+    """Whether the Parquet copy exists and is not older than the CSV it mirrors.
+
+    Tools that rewrite only the CSV (the notebook exports just the CSV) leave a
+    stale Parquet copy behind; readers go back to the CSV until it is rewritten.
+    """
+    if not os.path.exists(parquet_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+
+
+def arrow_path_for(parquet_path):
+    """Memory-mappable Arrow copy written alongside a Parquet output"""
+    return os.path.splitext(parquet_path)[0] + '.arrow'
+
+
+def write_arrow(parquet_path, arrow_path):
+    """Rewrite the Parquet output as an uncompressed Arrow IPC file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # An IPC file holds one dictionary per column, while each Parquet row group has its own
+    table = pq.read_table(parquet_path).unify_dictionaries()
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(arrow_path)), suffix='.tmp')
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, arrow_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def load_shared(columns=DATA_COLUMNS, csv_path=CSV_PATH, parquet_path=None):
+    """Selected columns as a read-only frame over the memory-mapped Arrow copy.
+
+    The Arrow file is (re)written when it is missing or older than the Parquet
+    output. Without a current Parquet output, or where the Arrow file cannot be
+    written, this falls back to load_classifications().
+    """
+    parquet_path = parquet_path or parquet_path_for(csv_path)
+    if not parquet_is_current(csv_path, parquet_path):
+        return load_classifications(columns, csv_path, parquet_path)
+    import pyarrow as pa
+    arrow_path = arrow_path_for(parquet_path)
+    if not os.path.exists(arrow_path) or os.path.getmtime(arrow_path) < os.path.getmtime(parquet_path):
+        try:
+            write_arrow(parquet_path, arrow_path)
+        except OSError:  # read-only deployment: read the Parquet file instead
+            return load_classifications(columns, csv_path, parquet_path)
+    table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all().select(list(columns))
+    # Strings and lists stay Arrow-backed and unconsolidated numeric blocks can point into the mapping
+    return table.to_pandas(split_blocks=True, types_mapper=_arrow_types())
+
+
+def _arrow_types():
+    """to_pandas types_mapper keeping lists, and strings where pandas does not already, Arrow-backed"""
+    import pyarrow as pa
+    try:
+        # pandas >= 3: the default str dtype wraps the Arrow buffers
+        strings = not pd.get_option('future.infer_string')
+    except KeyError:  # OptionError on pandas without the option
+        strings = True
+
+    def mapper(arrow_type):
+        if pa.types.is_list(arrow_type):
+            return pd.ArrowDtype(arrow_type)
+        if strings and arrow_type in (pa.string(), pa.large_string()):
+            return pd.StringDtype('pyarrow')
+        return None
+    return mapper
+
+
+def load_classifications(columns=DATA_COLUMNS, csv_path=CSV_PATH, parquet_path=None):
+    """Load selected columns, preferring the Parquet copy unless the CSV is newer"""
+    parquet_path = parquet_path or parquet_path_for(csv_path)
+    if parquet_is_current(csv_path, parquet_path):
+        return pd.read_parquet(parquet_path, columns=list(columns))
+    return to_columnar(pd.read_csv(csv_path, usecols=list(columns), dtype=CSV_DTYPES))
+
+
+def available_columns(csv_path=CSV_PATH, parquet_path=None):
+    """Column names present in the output (Parquet schema or CSV header)"""
+    parquet_path = parquet_path or parquet_path_for(csv_path)
+    if parquet_is_current(csv_path, parquet_path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(parquet_path).names
+    return pd.read_csv(csv_path, nrows=0).columns.tolist()
+
+
+def load_search_fields(csv_path=CSV_PATH, parquet_path=None, keyword_names=None):
+    """Text columns the search index covers, limited to those the output has.
+
+    With keyword_names (the dictionary the Keyword IDs refer to) the matched
+    keywords are indexed too, as a Keywords column of their names. Outputs
+    written before the structured columns index their Explanation text.
+    """
+    available = available_columns(csv_path, parquet_path)
+    columns = [c for c in SEARCH_COLUMNS + ['Explanation'] if c in available]
+    if keyword_names is not None and KEYWORD_IDS in available:
+        columns.append(KEYWORD_IDS)
+    fields = load_classifications(columns, csv_path, parquet_path)
+    if KEYWORD_IDS in fields.columns:
+        fields[KEYWORDS] = keyword_text(fields.pop(KEYWORD_IDS), keyword_names)
+    return fields
+
+
+def load_explanations(csv_path=CSV_PATH, parquet_path=None):
+    """Explanation columns only, aligned with the rows of load_classifications"""
+    return load_classifications(EXPLANATION_COLUMNS, csv_path, parquet_path)
+
+
+def export_formats():
+    """Download formats usable here (Excel needs the optional openpyxl package)"""
+    formats = list(EXPORT_FORMATS)
+    if importlib.util.find_spec('openpyxl') is None:
+        formats.remove('Excel')
+    return formats
+
+
+def export_bytes(chunks, fmt='CSV'):
+    """Serialize an iterable of row chunks into a single download in the given format"""
+    buffer = io.BytesIO()
+    if fmt == 'CSV':
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True)
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(text, index=False, header=(i == 0))
+        text.detach()
+    elif fmt == 'Parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(buffer, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    elif fmt == 'Excel':
+        # openpyxl keeps the whole workbook in memory anyway, so write it in one go
+        pd.concat(list(chunks)).to_excel(buffer, index=False, engine='openpyxl')
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
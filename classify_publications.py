@@ -0,0 +1,804 @@
+"""Incremental Smart Hybrid classification of faculty publications.
+
+Script version of production_classification_final.ipynb. By default only
+publications added (or modified) since the last run are pulled, classified and
+merged into production_classifications.csv; the high-water mark lives in a
+small JSON state file. Editing MATERIAL_KEYWORDS also reclassifies the
+publications whose text contains an added, removed or moved phrase, found
+through a token index kept next to the output (keyword_index.py).
+
+    python classify_publications.py                    # incremental run (MySQL)
+    python classify_publications.py --full             # reclassify everything
+    python classify_publications.py --make-demo-db demo.sqlite
+    python classify_publications.py --sqlite demo.sqlite --rule-based-only
+    python classify_publications.py --replicate-to replica.sqlite   # MySQL -> SQLite copy
+    python classify_publications.py --sqlite replica.sqlite --all-years --chunksize 5000
+    python classify_publications.py --local-model local_classifier.npz   # local tier before the API
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import pickle
+import queue
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import write_atomic
+from classification_cache import ClassificationCache, cached_classify_many, cached_classify_series
+from classification_store import (AI_CATEGORY, CSV_DTYPES, EXPLANATION_COLUMNS, KEYWORD_IDS, SCORE_PREFIX,
+                                  ParquetChunkWriter, format_keyword_ids, normalize_doi, parquet_path_for,
+                                  publication_keys, remap_keyword_ids, write_parquet)
+from generative_classifier import GenerativeClassifier, prompt_version
+from keyword_index import KeywordIndex, changed_phrases, index_path_for
+from local_classifier import DEFAULT_THRESHOLD as LOCAL_THRESHOLD, LocalClassifier
+from material_classifier import MATERIAL_KEYWORDS, keyword_id_map, keywords_version, prepare_texts
+from parallel_classify import ShardPool
+from pipeline_metrics import DEFAULT_METRICS, RunMetrics
+
+CONFIDENCE_THRESHOLD = 0.85  # 85% threshold
+DEFAULT_OUTPUT = 'production_classifications.csv'
+DEFAULT_STATE = 'classification_state.json'
+
+SCORE_COLUMNS = [SCORE_PREFIX + category for category in MATERIAL_KEYWORDS]
+EXPORT_COLUMNS = (['publication_id', 'Faculty', 'Title', 'Year', 'Journal', 'DOI', 'Category', 'Method']
+                  + EXPLANATION_COLUMNS + SCORE_COLUMNS + [AI_CATEGORY])
+# Row order of the output, the same as build_query's ORDER BY
+OUTPUT_ORDER = ['Year', 'publication_id']
+OUTPUT_ASCENDING = [False, True]
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS master_faculty (
+    unity_id    TEXT PRIMARY KEY,
+    first_name  TEXT,
+    last_name   TEXT
+);
+CREATE TABLE IF NOT EXISTS publications (
+    publication_id    INTEGER PRIMARY KEY,
+    title             TEXT,
+    publication_year  INTEGER,
+    keywords          TEXT,
+    faculty_unity_id  TEXT REFERENCES master_faculty (unity_id),
+    doi               TEXT,
+    journal_name      TEXT,
+    updated_at        TEXT
+);
+"""
+
+
+# ========================================
+# DATABASE
+# ========================================
+def mysql_config():
+    """Connection settings for mse_db_test_ncsu from the environment (.env)"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return dict(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD'),
+        database=os.getenv('DB_NAME', 'mse_db_test_ncsu'),
+        connection_timeout=10
+    )
+
+
+def connect(sqlite_path=None):
+    """Open the MySQL database (env DB_* settings) or a SQLite stand-in"""
+    if sqlite_path:
+        return sqlite3.connect(sqlite_path)
+
+    import mysql.connector
+    return mysql.connector.connect(**mysql_config())
+
+
+class ConnectionPool:
+    """A few long-lived connections shared by the streaming stages and threads"""
+
+    def __init__(self, sqlite_path=None, size=2):
+        self._mysql = None
+        self._idle = queue.Queue()
+        if sqlite_path:
+            for _ in range(size):
+                self._idle.put(sqlite3.connect(sqlite_path, check_same_thread=False))
+        else:
+            from mysql.connector import pooling
+            self._mysql = pooling.MySQLConnectionPool(pool_name='classify_publications', pool_size=size,
+                                                      **mysql_config())
+
+    @contextmanager
+    def connection(self):
+        if self._mysql is not None:
+            conn = self._mysql.get_connection()
+            try:
+                yield conn
+            finally:
+                conn.close()  # hands the connection back to the pool
+            return
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def build_query(sqlite=False, since_id=None, since_modified=None, modified_column=None,
+                from_year=2021, to_year=2025, publication_ids=None):
+    """TIER 1 query, optionally restricted to rows past the high-water mark
+
+    from_year/to_year of None drop the publication-year window; rows without a
+    publication year are skipped either way, since the output is typed and
+    ordered by Year. publication_ids are selected in addition to the rows past
+    the high-water mark.
+    """
+    placeholder = '?' if sqlite else '%s'
+    faculty_name = ("f.first_name || ' ' || f.last_name" if sqlite
+                    else "CONCAT(f.first_name, ' ', f.last_name)")
+    modified = f", p.{modified_column} as last_modified" if modified_column else ""
+
+    conditions = [
+        "p.publication_year IS NOT NULL",
+        "p.doi IS NOT NULL",
+        "p.doi LIKE '10.%'",
+        "p.journal_name IS NOT NULL",
+        "p.journal_name != ''",
+    ]
+    params = []
+    if from_year is not None:
+        conditions.append(f"p.publication_year >= {placeholder}")
+        params.append(from_year)
+    if to_year is not None:
+        conditions.append(f"p.publication_year <= {placeholder}")
+        params.append(to_year)
+
+    incremental = []
+    if since_id is not None:
+        incremental.append(f"p.publication_id > {placeholder}")
+        params.append(since_id)
+    if modified_column and since_modified is not None:
+        incremental.append(f"p.{modified_column} > {placeholder}")
+        params.append(since_modified)
+    if incremental and publication_ids:
+        # Inlined: ids come from our own index, and can outnumber SQLite's bound-parameter limit
+        incremental.append(f"p.publication_id IN ({', '.join(str(int(i)) for i in publication_ids)})")
+    if incremental:
+        conditions.append('(' + ' OR '.join(incremental) + ')')
+
+    query = f"""
+SELECT
+    p.publication_id,
+    p.title,
+    p.publication_year as year,
+    COALESCE(CAST(p.keywords AS CHAR), '') as keywords,
+    p.faculty_unity_id,
+    {faculty_name} as faculty_name,
+    p.doi,
+    p.journal_name{modified}
+FROM publications p
+LEFT JOIN master_faculty f ON p.faculty_unity_id = f.unity_id
+WHERE {' AND '.join(conditions)}
+ORDER BY p.publication_year DESC, p.publication_id
+"""
+    return query, params
+
+
+def make_demo_database(path, data_dir='docs/data'):
+    """Create a SQLite stand-in for mse_db_test_ncsu seeded from docs/data JSON"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SQLITE_SCHEMA)
+    now = datetime.now().isoformat(timespec='seconds')
+    publication_id = conn.execute("SELECT COALESCE(MAX(publication_id), 0) FROM publications").fetchone()[0]
+    for profile_path in sorted(glob.glob(os.path.join(data_dir, '*', 'profile.json'))):
+        faculty_dir = os.path.dirname(profile_path)
+        with open(profile_path) as f:
+            profile = json.load(f)
+        conn.execute("INSERT OR REPLACE INTO master_faculty VALUES (?, ?, ?)",
+                     (profile['unity_id'], profile['first_name'], profile['last_name']))
+        publications_path = os.path.join(faculty_dir, 'publications.json')
+        if not os.path.exists(publications_path):
+            continue
+        with open(publications_path) as f:
+            publications = json.load(f)
+        for pub in publications:
+            publication_id += 1
+            conn.execute("INSERT INTO publications VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (publication_id, pub.get('title'), pub.get('year'), None,
+                          profile['unity_id'], pub.get('doi'), pub.get('journal'), now))
+    conn.commit()
+    conn.close()
+    return publication_id
+
+
+def make_replica(source, path, chunksize=10_000):
+    """Copy publications/master_faculty from a ConnectionPool into a SQLite replica"""
+    replica = sqlite3.connect(path)
+    replica.executescript(SQLITE_SCHEMA)
+    counts = {}
+    with source.connection() as conn:
+        for table in ('master_faculty', 'publications'):
+            columns = [row[1] for row in replica.execute(f"PRAGMA table_info({table})")]
+            if table == 'publications':
+                # Not every deployment has a last-modified column
+                columns.remove('updated_at')
+            insert = (f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                      f"VALUES ({', '.join('?' * len(columns))})")
+            counts[table] = 0
+            for chunk in pd.read_sql(f"SELECT {', '.join(columns)} FROM {table}", conn, chunksize=chunksize):
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                replica.executemany(insert, chunk.itertuples(index=False, name=None))
+                counts[table] += len(chunk)
+            replica.commit()
+    replica.close()
+    return counts
+
+
+# ========================================
+# STATE & OUTPUT
+# ========================================
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def merge_output(existing, new):
+    """Replace rows of `existing` that were reclassified and append new ones"""
+    if existing is None or existing.empty:
+        merged = new
+    elif 'publication_id' not in existing.columns:
+        # Output written before incremental runs has no key to merge on
+        merged = new
+    else:
+        # Columns added since the existing output was written come out empty for its rows
+        kept = existing[~existing['publication_id'].isin(new['publication_id'])].reindex(columns=new.columns)
+        merged = pd.concat([kept, new], ignore_index=True)
+    return merged.sort_values(OUTPUT_ORDER, ascending=OUTPUT_ASCENDING).reset_index(drop=True)
+
+
+def merge_output_chunks(new_chunks, kept_chunks):
+    """merge_output over two streams of frames that are each already in output order
+
+    Yields the merged rows in output order, never holding more than one frame
+    of each stream plus the rows between them.
+    """
+    streams = [iter(new_chunks), iter(kept_chunks)]
+    buffers = [None, None]
+    while True:
+        for i, stream in enumerate(streams):
+            while stream is not None and (buffers[i] is None or buffers[i].empty):
+                buffers[i] = next(stream, None)
+                if buffers[i] is None:
+                    streams[i] = stream = None
+        live = [buffer for buffer in buffers if buffer is not None and not buffer.empty]
+        if not live:
+            return
+        if len(live) == 1:
+            # The other stream is exhausted
+            buffers = [None, None]
+            yield live[0].reset_index(drop=True)
+            continue
+
+        # Rows up to the earlier of the two buffers' last rows are final
+        newest_first, last_id = min((-int(b['Year'].iloc[-1]), int(b['publication_id'].iloc[-1])) for b in live)
+        last_year = -newest_first
+        parts, rest = [], []
+        for buffer in live:
+            years, ids = buffer['Year'].to_numpy(), buffer['publication_id'].to_numpy()
+            ready = (years > last_year) | ((years == last_year) & (ids <= last_id))
+            parts.append(buffer[ready])
+            rest.append(buffer[~ready])
+        buffers = rest
+        yield (pd.concat(parts, ignore_index=True)
+               .sort_values(OUTPUT_ORDER, ascending=OUTPUT_ASCENDING, kind='stable').reset_index(drop=True))
+
+
+# ========================================
+# CLASSIFICATION
+# ========================================
+def prepare_frame(df, pool=None):
+    """Add the cleaned text_for_classification column"""
+    if pool is not None:
+        df['text_for_classification'] = pool.prepare_texts(df)
+    else:
+        df['text_for_classification'] = prepare_texts(df)
+    return df
+
+
+def classify_hybrid(df, cache, generative=None, threshold=CONFIDENCE_THRESHOLD, metrics=None, pool=None,
+                    local=None, local_threshold=LOCAL_THRESHOLD):
+    """Rule-based first, generative only when rule-based confidence < threshold.
+
+    With a trained LocalClassifier, those publications try the local model
+    next and only reach the API when its confidence is < local_threshold.
+
+    Rows sharing a normalized DOI (the same paper listed under several
+    faculty) are classified once, from their first row, and share the result.
+    """
+    metrics = metrics or RunMetrics()
+    df['publication_key'] = publication_keys(df['doi'] if 'doi' in df.columns else None, df['title'])
+    codes, keys = pd.factorize(df['publication_key'])
+    first = np.unique(codes, return_index=True)[1]
+    texts = df['text_for_classification'].iloc[first].reset_index(drop=True)
+
+    with metrics.stage('rule_based'):
+        if pool is not None:
+            rule_based = cached_classify_series(cache, texts, matcher=pool.matcher, classify=pool.classify_series)
+        else:
+            rule_based = cached_classify_series(cache, texts)
+
+    papers = rule_based[['category', 'confidence', 'explanation']].reset_index(drop=True)
+    papers['method'] = 'rule_based'
+
+    needs_api = (papers['confidence'] < threshold).to_numpy(copy=True)
+    if local is not None and needs_api.any():
+        with metrics.stage('local'):
+            local_results = local.classify(texts[needs_api])
+        confident = local_results[local_results['confidence'] >= local_threshold]
+        papers.loc[confident.index, ['category', 'confidence', 'explanation']] = confident.values
+        papers.loc[confident.index, 'method'] = 'local'
+        needs_api[confident.index] = False
+
+    if generative is not None and needs_api.any():
+        with metrics.stage('generative'):
+            gen_results = asyncio.run(cached_classify_many(cache, generative, texts[needs_api]))
+        papers.loc[needs_api, ['category', 'confidence', 'explanation']] = gen_results
+        papers.loc[needs_api, 'method'] = 'generative'
+
+    # Raw per-category scores (from the rule-based pass) and any cached generative label,
+    # replayed by threshold_simulator.py
+    with metrics.stage('scores'):
+        papers['keyword_ids'] = rule_based['keyword_ids'].to_numpy()
+        for category in MATERIAL_KEYWORDS:
+            papers[SCORE_PREFIX + category] = rule_based[category].to_numpy(dtype='float32')
+        ai_version = generative.version if generative is not None else prompt_version()
+        ai_labels = cache.get_many('generative', ai_version, texts, count=False)
+        papers['ai_category'] = [ai_labels[i][0] if i in ai_labels else None for i in range(len(texts))]
+
+    # Structured explanation: the keyword ids above plus a short reason where there is one
+    no_keywords = (papers['method'] == 'rule_based') & (papers['keyword_ids'].map(len) == 0)
+    papers['reason'] = papers['explanation'].where(no_keywords)
+    generative_rows = papers['method'] == 'generative'
+    papers.loc[generative_rows, 'reason'] = papers.loc[generative_rows, 'explanation'].str.removeprefix('AI: ')
+
+    for column in papers.columns:
+        df[column] = papers[column].to_numpy()[codes]
+    df['doi'] = [normalize_doi(doi) for doi in df['doi']] if 'doi' in df.columns else None
+    return df
+
+
+def export_frame(df):
+    """Columns written to production_classifications.csv"""
+    export_df = df[['publication_id', 'faculty_name', 'title', 'year', 'journal_name', 'doi', 'category', 'method',
+                    'confidence', 'keyword_ids', 'reason']
+                   + SCORE_COLUMNS + ['ai_category']].copy()
+    export_df.columns = EXPORT_COLUMNS
+    export_df['Confidence'] = export_df['Confidence'].astype('float32')
+    export_df[KEYWORD_IDS] = export_df[KEYWORD_IDS].map(format_keyword_ids)
+    export_df['Method'] = export_df['Method'].replace({
+        'rule_based': 'Rule-Based',
+        'generative': 'OpenAI',
+        'local': 'Local Model',
+    })
+    return export_df
+
+
+# ========================================
+# STREAMING
+# ========================================
+_END_OF_STREAM = object()
+
+# Seconds between checks for a consumer that stopped reading
+_PUT_TIMEOUT = 0.5
+
+
+def stream_publications(db_pool, query, params, chunksize):
+    """Yield the query result chunk by chunk (fetchmany on a pooled connection)"""
+    with db_pool.connection() as conn:
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+            if len(chunk):  # an empty result still yields one empty frame
+                yield chunk
+
+
+def prepared_chunks(chunks, metrics, pool=None):
+    """Fetch and prepare one chunk at a time, timing both stages"""
+    while True:
+        with metrics.stage('load'):
+            df = next(chunks, None)
+        if df is None:
+            return
+        with metrics.stage('prepare'):
+            prepare_frame(df, pool)
+        yield df
+
+
+def prefetch(chunks, max_pending):
+    """Run a chunk generator on a background thread, at most max_pending chunks ahead.
+
+    The bounded queue is the back-pressure: while the consumer waits on the
+    generative API, the producer blocks instead of reading the whole table.
+    When the consumer stops early (an error, or closing this generator) the
+    producer is told to stop and closes `chunks`, releasing its connection.
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as exc:
+            put(exc)
+        finally:
+            chunks.close()
+            put(_END_OF_STREAM)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def spilled_chunks(spill):
+    """Frames pickled one after another into an open temporary file, in write order"""
+    spill.seek(0)
+    while True:
+        try:
+            yield pickle.load(spill)
+        except EOFError:
+            return
+
+
+def carried_over_chunks(args, updated_ids, id_map, summary):
+    """Rows of the previous output that were not reclassified in this run, chunk by chunk"""
+    for existing in pd.read_csv(args.output, chunksize=args.chunksize, dtype=CSV_DTYPES):
+        kept = existing[~existing['publication_id'].isin(updated_ids)].reindex(columns=EXPORT_COLUMNS)
+        if id_map is not None:
+            kept[KEYWORD_IDS] = remap_keyword_ids(kept[KEYWORD_IDS], id_map)
+        summary['output_rows'] += len(kept)
+        yield kept
+
+
+def write_stream(args, chunks, csv_file, parquet_file, metrics, summary, generative=None, pool=None, local=None,
+                 index=None):
+    """Classify chunks as they arrive and write them, with carried-over rows, in output order
+
+    Chunks arrive in OUTPUT_ORDER (build_query's ORDER BY), and so does every
+    previous output. A full run writes them straight through; an incremental
+    one spills them to a temporary file and merges them with the untouched
+    rows of the previous output, one chunk at a time.
+    """
+    carry_over = not args.full and os.path.exists(args.output)
+    parquet = ParquetChunkWriter(parquet_file)
+    written = 0
+
+    def write(export_df):
+        nonlocal written
+        export_df.to_csv(csv_file, index=False, header=not written)
+        parquet.write(export_df)
+        written += 1
+
+    try:
+        with tempfile.TemporaryFile() as spill:
+            updated_ids = []
+            with ClassificationCache(args.cache) as cache:
+                for df in chunks:
+                    classify_hybrid(df, cache, generative, args.threshold, metrics, pool, local, args.local_threshold)
+                    with metrics.stage('export'):
+                        export_df = export_frame(df)
+                        if carry_over:
+                            pickle.dump(export_df, spill, protocol=pickle.HIGHEST_PROTOCOL)
+                        else:
+                            write(export_df)
+                    updated_ids.append(df['publication_id'].to_numpy())
+                    update_summary(summary, df)
+                    if index is not None:
+                        index.update(df['publication_id'], df['text_for_classification'])
+                    print(f"   ✅ {summary['records']:,} publications classified")
+                print(f"💾 Cache: {cache.stats()}")
+                metrics.count(cache=cache.stats())
+
+            if carry_over:
+                kept = carried_over_chunks(args, np.concatenate(updated_ids), keyword_remap(index), summary)
+                with metrics.stage('export'):
+                    for merged in merge_output_chunks(spilled_chunks(spill), kept):
+                        write(merged)
+    finally:
+        parquet.close()
+
+
+def stream_classify(args, query, params, metrics, summary, generative=None, pool=None, local=None, index=None):
+    """Fetch -> prepare -> classify -> write, with a bounded number of chunks in memory"""
+    db_pool = ConnectionPool(args.sqlite)
+    chunks = prefetch(prepared_chunks(stream_publications(db_pool, query, params, args.chunksize), metrics, pool),
+                      args.max_pending)
+    try:
+        first = next(chunks, None)
+        if first is None:
+            return False
+
+        parquet_path = parquet_path_for(args.output)
+        write_atomic(args.output, lambda f: write_atomic(
+            parquet_path,
+            lambda pf: write_stream(args, chain([first], chunks), f, pf, metrics, summary, generative, pool, local,
+                                    index),
+            mode='wb'))
+        # The CSV was renamed into place last; stamp its Parquet copy so readers do not take it for stale
+        os.utime(parquet_path)
+        print(f"✅ Exported: {args.output} + {parquet_path} "
+              f"({summary['output_rows']} records, {summary['records']} updated)")
+        return True
+    finally:
+        chunks.close()  # stops the producer thread before its connection pool closes
+        db_pool.close()
+
+
+# ========================================
+# RUN
+# ========================================
+def keyword_remap(index):
+    """Old -> current keyword ids for carried-over rows; None when the output's dictionary is current"""
+    old = index.keywords() if index is not None else None
+    if old is None:
+        return None
+    id_map = keyword_id_map(old, MATERIAL_KEYWORDS)
+    if np.array_equal(id_map, np.arange(len(id_map))):
+        return None  # unchanged, or keywords only appended
+    return id_map
+
+
+def update_summary(summary, df):
+    """Fold a classified chunk into the run's counts and high-water marks"""
+    methods = df['method'].value_counts()
+    summary['records'] += len(df)
+    summary['papers'] += df['publication_key'].nunique()
+    summary['output_rows'] += len(df)
+    summary['rule_based'] += int(methods.get('rule_based', 0))
+    summary['generative'] += int(methods.get('generative', 0))
+    summary['local'] += int(methods.get('local', 0))
+    summary['confidence'] += float(df['confidence'].sum())
+    summary['last_publication_id'] = max(summary['last_publication_id'], int(df['publication_id'].max()))
+    if 'last_modified' in df.columns and df['last_modified'].notna().any():
+        latest = str(df['last_modified'].dropna().max())
+        summary['last_modified'] = max(latest, summary['last_modified'] or latest)
+
+
+def classify_all(args, query, params, metrics, summary, generative=None, pool=None, local=None, index=None):
+    """Load the whole result set, classify it and merge it into the output in one go"""
+    conn = connect(args.sqlite)
+    try:
+        with metrics.stage('load'):
+            df = pd.read_sql(query, conn, params=params)
+        print(f"✅ Loaded {len(df)} new/changed records in {metrics.stages['load']:.2f} seconds")
+    finally:
+        conn.close()
+
+    if df.empty:
+        return False
+
+    with metrics.stage('prepare'):
+        prepare_frame(df, pool)
+
+    with ClassificationCache(args.cache) as cache:
+        classify_hybrid(df, cache, generative, args.threshold, metrics, pool, local, args.local_threshold)
+        classify_seconds = sum(metrics.stages.get(stage, 0.0) for stage in ('rule_based', 'local', 'generative'))
+        print(f"✅ Classified {len(df)} publications ({df['publication_key'].nunique()} unique papers) "
+              f"in {classify_seconds:.1f} seconds")
+        print(f"💾 Cache: {cache.stats()}")
+        metrics.count(cache=cache.stats())
+
+    with metrics.stage('export'):
+        existing = None if args.full or not os.path.exists(args.output) else pd.read_csv(args.output, dtype=CSV_DTYPES)
+        id_map = keyword_remap(index)
+        if existing is not None and id_map is not None and KEYWORD_IDS in existing.columns:
+            existing[KEYWORD_IDS] = remap_keyword_ids(existing[KEYWORD_IDS], id_map)
+        merged = merge_output(existing, export_frame(df))
+        write_atomic(args.output, lambda f: merged.to_csv(f, index=False))
+        parquet_path = parquet_path_for(args.output)
+        write_atomic(parquet_path, lambda f: write_parquet(merged, f), mode='wb')
+    print(f"✅ Exported: {args.output} + {parquet_path} ({len(merged)} records, {len(df)} updated)")
+
+    update_summary(summary, df)
+    summary['output_rows'] = len(merged)
+    if index is not None:
+        index.update(df['publication_id'], df['text_for_classification'])
+    return True
+
+
+def build_index(args, index):
+    """Index the texts of every publication in the year window, without classifying them"""
+    query, params = build_query(sqlite=bool(args.sqlite), from_year=args.from_year, to_year=args.to_year)
+    conn = connect(args.sqlite)
+    try:
+        for df in pd.read_sql(query, conn, params=params, chunksize=args.chunksize or 10_000):
+            prepare_frame(df)
+            index.update(df['publication_id'], df['text_for_classification'])
+    finally:
+        conn.close()
+    index.set_keywords(MATERIAL_KEYWORDS)
+    index.mark_complete()
+
+
+def plan_reclassification(args, index, state):
+    """Publications a keyword edit since the last run can affect; None means reclassify everything"""
+    if not index.complete() or index.keywords() is None:
+        if state.get('keywords_version', keywords_version()) != keywords_version():
+            return None  # edited before the index existed: no record of what the output was scored with
+        print("🔄 Building keyword index of the existing output...")
+        build_index(args, index)
+        return set()
+    changed = changed_phrases(index.keywords(), MATERIAL_KEYWORDS)
+    if changed is None:
+        return None
+    if changed:
+        print(f"🔄 {len(changed)} keyword phrases changed since the last run")
+    return index.publications_with(changed)
+
+
+def run(args):
+    state = {} if args.full else load_state(args.state)
+    index = KeywordIndex(index_path_for(args.output))
+    try:
+        run_indexed(args, state, index)
+    finally:
+        index.close()
+
+
+def run_indexed(args, state, index):
+    if not args.full and os.path.exists(args.output):
+        missing = [column for column in EXPORT_COLUMNS if column not in pd.read_csv(args.output, nrows=0).columns]
+        if missing:
+            # e.g. Keyword IDs/Reason before structured explanations; carried-over rows would come out blank
+            print(f"🔄 Output has no {', '.join(missing)} column(s) - reclassifying everything")
+            args.full, state = True, {}
+
+    reclassify = None
+    if state.get('last_publication_id') is not None and os.path.exists(args.output):
+        reclassify = plan_reclassification(args, index, state)
+        if reclassify is None:
+            print("🔄 Keyword categories changed - reclassifying everything")
+            args.full, state = True, {}
+        elif reclassify:
+            print(f"🔄 {len(reclassify)} publications contain changed keywords and are reclassified")
+    if reclassify is None:
+        index.clear()  # rebuilt from scratch by this run
+
+    since_id = state.get('last_publication_id')
+    since_modified = state.get('last_modified')
+    metrics = RunMetrics()
+    query, params = build_query(sqlite=bool(args.sqlite), since_id=since_id, since_modified=since_modified,
+                                modified_column=args.modified_column,
+                                from_year=args.from_year, to_year=args.to_year, publication_ids=reclassify)
+
+    summary = {'records': 0, 'papers': 0, 'output_rows': 0, 'rule_based': 0, 'local': 0, 'generative': 0,
+               'confidence': 0.0, 'last_publication_id': since_id or 0, 'last_modified': None}
+    generative = None if args.rule_based_only else GenerativeClassifier(
+        base_url=args.base_url, concurrency=args.concurrency,
+        requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    local = LocalClassifier.load(args.local_model) if args.local_model else None
+    pool = ShardPool(args.workers or None) if args.workers != 1 else None
+    try:
+        classify = stream_classify if args.chunksize else classify_all
+        if not classify(args, query, params, metrics, summary, generative, pool, local, index):
+            print("💤 Nothing to classify - output is up to date")
+            # Keyword IDs in the output still number the recorded dictionary's entries
+            if index.complete() and keyword_remap(index) is None:
+                index.set_keywords(MATERIAL_KEYWORDS)
+            return
+    finally:
+        if pool is not None:
+            pool.close()
+    # The output now reflects the current dictionary for every indexed publication
+    index.set_keywords(MATERIAL_KEYWORDS)
+    index.mark_complete()
+
+    if generative is not None:
+        print(f"💰 API calls: {generative.stats['api_calls']} ({generative.stats['retries']} retries)")
+
+    metrics.count(
+        records=summary['records'],
+        papers=summary['papers'],
+        output_rows=summary['output_rows'],
+        rule_based=summary['rule_based'],
+        local=summary['local'],
+        generative=summary['generative'],
+        mean_confidence=round(summary['confidence'] / summary['records'], 4),
+        model=generative.model if generative is not None else None,
+        **(generative.stats if generative is not None else {}),
+    )
+    write_atomic(args.metrics, lambda f: json.dump(metrics.to_dict(), f, indent=2))
+    print(f"⏱️ Stage timings (written to {args.metrics}):\n{metrics.summary()}")
+
+    new_state = {
+        'last_publication_id': summary['last_publication_id'],
+        'last_modified': since_modified,
+        'keywords_version': keywords_version(),
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': summary['output_rows'],
+    }
+    if args.modified_column and summary['last_modified']:
+        new_state['last_modified'] = max(summary['last_modified'], since_modified or summary['last_modified'])
+    write_atomic(args.state, lambda f: json.dump(new_state, f, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental Smart Hybrid publication classification")
+    parser.add_argument('--full', action='store_true', help="Ignore the state file and reclassify everything")
+    parser.add_argument('--sqlite', help="Use a SQLite stand-in database instead of MySQL")
+    parser.add_argument('--make-demo-db', metavar='PATH', help="Create a SQLite stand-in from docs/data and exit")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--state', default=DEFAULT_STATE)
+    parser.add_argument('--cache', default='classification_cache.sqlite')
+    parser.add_argument('--metrics', default=DEFAULT_METRICS, help="Where to write stage timings and API usage")
+    parser.add_argument('--modified-column', help="Column holding the last-modified timestamp (e.g. updated_at)")
+    parser.add_argument('--from-year', type=int, default=2021)
+    parser.add_argument('--to-year', type=int, default=2025)
+    parser.add_argument('--all-years', action='store_true', help="Drop the publication-year window")
+    parser.add_argument('--chunksize', type=int,
+                        help="Stream the query result in chunks of this many rows instead of loading it at once")
+    parser.add_argument('--max-pending', type=int, default=4,
+                        help="Chunks fetched ahead of classification when streaming")
+    parser.add_argument('--replicate-to', metavar='PATH',
+                        help="Copy publications/master_faculty into a SQLite replica and exit")
+    parser.add_argument('--threshold', type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument('--rule-based-only', action='store_true', help="Skip the generative API")
+    parser.add_argument('--local-model', help="Trained local_classifier.py model tried before the generative API")
+    parser.add_argument('--local-threshold', type=float, default=LOCAL_THRESHOLD,
+                        help="Local model confidence needed to skip the API")
+    parser.add_argument('--base-url', help="Chat-completions base URL (e.g. the local stub server)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes for text preparation and rule-based scoring (0 = all cores)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rpm', type=int, default=500, help="Requests-per-minute budget")
+    parser.add_argument('--tpm', type=int, default=200_000, help="Tokens-per-minute budget")
+    args = parser.parse_args()
+    if args.all_years:
+        args.from_year = args.to_year = None
+
+    if args.make_demo_db:
+        count = make_demo_database(args.make_demo_db)
+        print(f"✅ Demo database written to {args.make_demo_db} ({count} publications)")
+        return
+    if args.replicate_to:
+        source = ConnectionPool(args.sqlite, size=1)
+        try:
+            counts = make_replica(source, args.replicate_to, args.chunksize or 10_000)
+        finally:
+            source.close()
+        print(f"✅ Replica written to {args.replicate_to} ({counts})")
+        return
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
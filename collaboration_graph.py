@@ -0,0 +1,281 @@
+"""Department-wide co-authorship graph behind coi_stats.json.
+
+Instead of walking each faculty member's papers separately, the graph is built
+once from an authorship table (one row per author of a work) and every
+faculty's COI statistics are read off it with sparse-matrix operations:
+
+- authors (OpenAlex IDs) and works are integer-coded with pd.factorize
+- incidence: works x authors, 1 where the author is on the work
+- weights: authors x authors, number of shared works (incidence.T @ incidence)
+- year_bits: same sparsity as weights; bit k set when the pair shared a work
+  in base_year + k, so time-window queries are a bitwise AND
+
+Authorship columns: work_id, year, openalex_id, name, institution, node_type
+('faculty', 'ncsu_nonfaculty' or 'external') and optionally country.
+
+    python collaboration_graph.py --authorships authorships.parquet --data-dir docs/data
+    python collaboration_graph.py --authorships authorships.parquet --pairs pairs.csv --since 2023
+"""
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from atomic_files import write_atomic
+
+NODE_COLUMNS = ['name', 'institution', 'node_type', 'country']
+INTERNAL_TYPES = ['faculty', 'ncsu_nonfaculty']
+TOP_COLLABORATORS = 20
+TOP_INSTITUTIONS = 10
+# Nodes per 2-hop product in the density query
+EGO_BATCH_NODES = 64
+
+
+def load_authorships(path):
+    """Authorship table from CSV or Parquet"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def years_from_bits(bits, base_year):
+    """Years set in a year bitset, most recent first"""
+    bits = int(bits)
+    return [base_year + k for k in range(bits.bit_length() - 1, -1, -1) if bits >> k & 1]
+
+
+def first_years(bits, base_year):
+    """Earliest year set in each bitset (lowest set bit)"""
+    bits = np.asarray(bits, dtype=np.int64)
+    return base_year + np.log2(bits & -bits).astype(int)
+
+
+class CollaborationGraph:
+    """Sparse co-authorship graph with per-pair shared-work counts and year bitsets"""
+
+    def __init__(self, authorships):
+        authorships = (authorships.dropna(subset=['work_id', 'year', 'openalex_id'])
+                       .drop_duplicates(['work_id', 'openalex_id']))
+        author_codes, self.author_ids = pd.factorize(authorships['openalex_id'])
+        work_codes, self.work_ids = pd.factorize(authorships['work_id'])
+        n_authors, n_works = len(self.author_ids), len(self.work_ids)
+
+        nodes = authorships.assign(node=author_codes).drop_duplicates('node').set_index('node').sort_index()
+        nodes = nodes.reindex(columns=NODE_COLUMNS).reset_index(drop=True)
+        self.nodes = nodes.astype(object).where(nodes.notna(), None)
+        self.nodes['openalex_id'] = self.author_ids
+
+        self.work_years = np.zeros(n_works, dtype=np.int64)
+        self.work_years[work_codes] = authorships['year'].astype(int).to_numpy()
+        self.base_year = int(self.work_years.min()) if n_works else datetime.now().year
+        if n_works and self.work_years.max() - self.base_year > 62:
+            raise ValueError(f"Year span {self.base_year}-{self.work_years.max()} does not fit a 63-bit bitset")
+
+        self.incidence = sparse.csr_matrix(
+            (np.ones(len(authorships), dtype=np.int32), (work_codes, author_codes)), shape=(n_works, n_authors))
+        self.weights = self._without_diagonal(self.incidence.T @ self.incidence)
+
+        # One product per publication year; the bits are disjoint, so summing ORs them
+        bits = sparse.csr_matrix((n_authors, n_authors), dtype=np.int64)
+        for year in np.unique(self.work_years):
+            works = self.incidence[self.work_years == year]
+            shared = (works.T @ works).astype(bool).astype(np.int64)
+            bits = bits + shared * (1 << int(year - self.base_year))
+        self.year_bits = self._without_diagonal(bits)
+
+        self._adjacency = self.weights.astype(bool).astype(np.int32)
+        self._author_works = self.incidence.tocsc()
+        institution_codes, self.institutions = pd.factorize(self.nodes['institution'])
+        known = institution_codes >= 0
+        # authors x institutions, for per-institution paper counts
+        self._by_institution = sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.int32), (np.flatnonzero(known), institution_codes[known])),
+            shape=(n_authors, len(self.institutions)))
+
+    @staticmethod
+    def _without_diagonal(matrix):
+        matrix = matrix.tocsr()
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        return matrix
+
+    def node_index(self, openalex_ids):
+        """Integer node of each OpenAlex ID, -1 when the author is not in the graph"""
+        return pd.Index(self.author_ids).get_indexer(openalex_ids)
+
+    def year_mask(self, since=None, until=None):
+        """Bitset of the years in [since, until]"""
+        since = self.base_year if since is None else max(since, self.base_year)
+        until = self.base_year + 62 if until is None else min(until, self.base_year + 62)
+        if until < since:
+            return 0
+        return ((1 << (until - since + 1)) - 1) << (since - self.base_year)
+
+    def overview(self, nodes, recent_years=2, current_year=None):
+        """coi_stats overview of each node (one row per node, all computed at once)"""
+        nodes = np.asarray(nodes)
+        current_year = current_year or datetime.now().year
+        rows = self.weights[nodes]
+        degree = np.diff(rows.indptr)
+        row_ids = np.repeat(np.arange(len(nodes)), degree)
+
+        internal = self.nodes['node_type'].isin(INTERNAL_TYPES).to_numpy()
+        internal_count = np.bincount(row_ids, weights=internal[rows.indices], minlength=len(nodes))
+        recent = (self.year_bits[nodes].data & self.year_mask(current_year - recent_years + 1, current_year)) != 0
+        recent_count = np.bincount(row_ids, weights=recent, minlength=len(nodes))
+
+        edges = degree + self._edges_among_neighbours(nodes)
+        size = degree + 1
+        possible = size * (size - 1) / 2
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'total_collaborators': degree,
+                'internal_count': internal_count.astype(int),
+                'internal_percentage': np.where(degree > 0, internal_count / degree * 100, 0.0),
+                'external_count': (degree - internal_count).astype(int),
+                'external_percentage': np.where(degree > 0, (degree - internal_count) / degree * 100, 0.0),
+                'network_density': np.where(possible > 0, edges / possible, 0.0).round(3),
+                'recent_collaborations_2years': recent_count.astype(int),
+            })
+
+    def _edges_among_neighbours(self, nodes, batch_size=EGO_BATCH_NODES):
+        """Edges between the collaborators of each node: diag(R @ A @ R.T) / 2 for neighbour rows R"""
+        edges = np.zeros(len(nodes))
+        # Batched so the 2-hop product R @ A stays small for departments with hundreds of faculty
+        for start in range(0, len(nodes), batch_size):
+            rows = self._adjacency[nodes[start:start + batch_size]]
+            two_hop = rows @ self._adjacency
+            edges[start:start + batch_size] = np.asarray(two_hop.multiply(rows).sum(axis=1)).ravel() / 2
+        return edges
+
+    def collaborators(self, node):
+        """Neighbours of one node with shared-work counts and year bitsets"""
+        start, end = self.weights.indptr[node], self.weights.indptr[node + 1]
+        neighbours = self.weights.indices[start:end]
+        frame = self.nodes.iloc[neighbours].reset_index(drop=True)
+        frame['node'] = neighbours
+        frame['collaboration_count'] = self.weights.data[start:end]
+        frame['year_bits'] = self.year_bits.data[start:end]
+        return frame
+
+    def coi_stats(self, node, overview, top_collaborators=TOP_COLLABORATORS, top_institutions=TOP_INSTITUTIONS):
+        """coi_stats.json document for one node, given its row of overview()"""
+        collaborators = self.collaborators(node).sort_values(
+            ['collaboration_count', 'name'], ascending=[False, True], kind='stable')
+        top = collaborators.head(top_collaborators)
+
+        works = self._author_works.indices[self._author_works.indptr[node]:self._author_works.indptr[node + 1]]
+        coauthors = self.incidence[works]
+        coauthors.data[coauthors.indices == node] = 0  # own affiliation counts only via co-authors
+        paper_counts = np.asarray((coauthors @ self._by_institution).astype(bool).sum(axis=0)).ravel()
+        institution_rows = (collaborators.dropna(subset=['institution']).groupby('institution').size()
+                            .rename('collaborator_count').reset_index())
+        institution_rows['paper_count'] = paper_counts[self.institutions.get_indexer(institution_rows['institution'])]
+        institution_rows = institution_rows.sort_values(['collaborator_count', 'paper_count'], ascending=False,
+                                                        kind='stable').head(top_institutions)
+
+        years, papers = np.unique(self.work_years[works], return_counts=True)
+        new = pd.Series(first_years(collaborators['year_bits'], self.base_year)).value_counts()
+        stats = {
+            'overview': overview,
+            'top_collaborators': [
+                {'openalex_id': row.openalex_id, 'name': row.name, 'institution': row.institution,
+                 'node_type': row.node_type, 'collaboration_count': int(row.collaboration_count),
+                 'years': ','.join(str(y) for y in years_from_bits(row.year_bits, self.base_year))}
+                for row in top.itertuples()],
+            'top_institutions': [
+                {'institution': row.institution, 'collaborator_count': int(row.collaborator_count),
+                 'paper_count': int(row.paper_count)}
+                for row in institution_rows.itertuples()],
+            'timeline': [{'year': int(year), 'papers': int(count), 'new_collaborators': int(new.get(year, 0))}
+                         for year, count in zip(years, papers)],
+        }
+        if collaborators['country'].notna().any():
+            countries = collaborators['country'].fillna('Other').value_counts()
+            stats['countries'] = [{'country': country, 'count': int(count)} for country, count in countries.items()]
+        return stats
+
+    def coauthored(self, since=None, until=None, among=None):
+        """Pairs of nodes (default: all faculty) that shared a work in [since, until]"""
+        if among is None:
+            among = np.flatnonzero(self.nodes['node_type'].eq('faculty').to_numpy())
+        among = np.asarray(among, dtype=int)
+        # weights and year_bits have the same sparsity pattern, so their upper triangles line up entry for entry
+        bits = sparse.triu(self.year_bits[among][:, among], k=1).tocoo()
+        weights = sparse.triu(self.weights[among][:, among], k=1).tocoo()
+        keep = (bits.data & self.year_mask(since, until)) != 0
+        a, b = among[bits.row[keep]], among[bits.col[keep]]
+        return pd.DataFrame({
+            'openalex_id_a': self.author_ids[a],
+            'name_a': self.nodes['name'].to_numpy()[a],
+            'openalex_id_b': self.author_ids[b],
+            'name_b': self.nodes['name'].to_numpy()[b],
+            'shared_works': weights.data[keep],
+            'years': [','.join(map(str, years_from_bits(v, self.base_year))) for v in bits.data[keep]],
+        })
+
+
+def faculty_profiles(data_dir='docs/data'):
+    """unity_id -> OpenAlex ID from every docs/data/<unity_id>/profile.json"""
+    profiles = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*', 'profile.json'))):
+        with open(path) as f:
+            profile = json.load(f)
+        if profile.get('openalex_id'):
+            profiles[profile['unity_id']] = profile['openalex_id']
+    return profiles
+
+
+def write_coi_stats(graph, profiles, data_dir='docs/data', recent_years=2, current_year=None):
+    """Refresh coi_stats.json of every faculty found in the graph; returns the unity_ids written"""
+    unity_ids = list(profiles)
+    nodes = graph.node_index([profiles[u] for u in unity_ids])
+    found = nodes >= 0
+    overview = graph.overview(nodes[found], recent_years, current_year)
+    written = []
+    for unity_id, node, row in zip(np.array(unity_ids)[found], nodes[found], overview.to_dict('records')):
+        stats = graph.coi_stats(node, {key: value.item() if hasattr(value, 'item') else value
+                                       for key, value in row.items()})
+        write_atomic(os.path.join(data_dir, unity_id, 'coi_stats.json'), lambda f: json.dump(stats, f, indent=2))
+        written.append(unity_id)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the co-authorship graph and refresh coi_stats.json")
+    parser.add_argument('--authorships', required=True, help="CSV or Parquet authorship table")
+    parser.add_argument('--data-dir', default='docs/data', help="Directory holding <unity_id>/profile.json")
+    parser.add_argument('--recent-years', type=int, default=2)
+    parser.add_argument('--pairs', help="Write faculty pairs who co-authored in --since/--until to this CSV "
+                                        "instead of refreshing coi_stats.json")
+    parser.add_argument('--since', type=int)
+    parser.add_argument('--until', type=int)
+    args = parser.parse_args()
+
+    graph = CollaborationGraph(load_authorships(args.authorships))
+    print(f"✅ Graph: {len(graph.author_ids):,} authors, {len(graph.work_ids):,} works, "
+          f"{graph.weights.nnz // 2:,} co-author pairs")
+
+    if args.pairs:
+        pairs = graph.coauthored(args.since, args.until)
+        pairs.to_csv(args.pairs, index=False)
+        print(f"💾 {len(pairs)} faculty pairs written to {args.pairs}")
+        return
+
+    profiles = faculty_profiles(args.data_dir)
+    written = write_coi_stats(graph, profiles, args.data_dir, args.recent_years)
+    missing = sorted(set(profiles) - set(written))
+    print(f"💾 coi_stats.json refreshed for {len(written)} faculty")
+    if missing:
+        print(f"   ⚠️ Not in the authorship table: {', '.join(missing)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Precomputed data layer for the Streamlit dashboard.
+
+Everything above the publications table only needs publication counts, so it
+is answered from count cubes built once per dataset instead of re-filtering and
+regrouping the full frame on every widget interaction: a (Year, Category,
+Faculty) cube over all rows and a (Year, Category) cube over unique papers.
+
+A paper listed under several faculty is one canonical publication, keyed by
+normalized DOI (normalized title when the output has no DOI). The
+faculty -> publication link index answers unique counts for a faculty
+selection: a paper counts once if any selected faculty is linked to it.
+
+The publications table is served from presorted row orders, one per sortable
+column: a filtered, sorted page is a boolean mask applied to an existing order
+followed by a slice, with no per-rerun sort.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from classification_store import publication_keys
+
+CUBE_DIMENSIONS = ['Year', 'Category', 'Faculty']
+UNIQUE_DIMENSIONS = ['Year', 'Category']
+SORT_COLUMNS = ['Year', 'Faculty', 'Category', 'Title', 'Method']
+
+
+class DashboardData:
+    """Loaded frame plus everything derived from it that does not depend on filters"""
+
+    def __init__(self, df):
+        self.df = df
+        self.years = sorted(df['Year'].dropna().unique())
+        self.categories = sorted(df['Category'].unique())
+        self.faculties = sorted(df['Faculty'].unique())
+        self.cube = count_cube(df)
+
+        # Canonical publication table (first row of each paper) and its row -> paper codes
+        keys = publication_keys(df['DOI'] if 'DOI' in df.columns else None, df['Title'])
+        self.publication_codes, _ = pd.factorize(np.array(keys, dtype=object))
+        first = np.unique(self.publication_codes, return_index=True)[1]
+        self.publications = df.iloc[first]
+        self.links = link_index(df['Faculty'], self.publication_codes, self.faculties, len(first))
+
+        self.cube_unique = count_cube(self.publications, UNIQUE_DIMENSIONS)
+        # Row of cube_unique each publication is counted in (same group order as count_cube)
+        self.publication_cells = self.publications.groupby(UNIQUE_DIMENSIONS, observed=True).ngroup().to_numpy()
+        self.sort_orders = {column: sort_orders(df[column]) for column in SORT_COLUMNS}
+
+
+def count_cube(df, dimensions=CUBE_DIMENSIONS):
+    """Publication counts per observed combination of the dimensions"""
+    return df.groupby(dimensions, observed=True).size().reset_index(name='Count')
+
+
+def link_index(faculty, publication_codes, faculties, n_publications):
+    """Boolean faculties x publications matrix; rows follow `faculties`"""
+    faculty_codes = pd.Index(faculties).get_indexer(faculty)
+    linked = faculty_codes >= 0
+    return sparse.csr_matrix(
+        (np.ones(linked.sum(), dtype=bool), (faculty_codes[linked], publication_codes[linked])),
+        shape=(len(faculties), n_publications))
+
+
+def unique_cube(data, years=None, categories=None, faculties=None):
+    """(Year, Category) counts of unique papers linked to any of the selected faculty"""
+    cube = data.cube_unique
+    if faculties is not None and len(set(faculties)) < len(data.faculties):
+        selected = np.isin(data.faculties, list(faculties)).astype(np.int32)
+        linked = (sparse.csr_matrix(selected) @ data.links.astype(np.int32)).toarray().ravel() > 0
+        counts = np.bincount(data.publication_cells[linked], minlength=len(cube))
+        cube = cube.assign(Count=counts)
+    return slice_cube(cube, years, categories)
+
+
+def slice_cube(cube, years=None, categories=None, faculties=None):
+    """Cube rows matching the selected filter values (None keeps everything)"""
+    mask = pd.Series(True, index=cube.index)
+    for column, selected in (('Year', years), ('Category', categories), ('Faculty', faculties)):
+        if selected is not None and column in cube.columns:
+            mask &= cube[column].isin(selected)
+    return cube[mask]
+
+
+def counts_by(cube, by):
+    """Sum a cube slice over the given dimension(s), largest first"""
+    counts = cube.groupby(by, observed=True)['Count'].sum()
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+def confidence_counts(confidence, methods, n_bins=20):
+    """Publications per method and confidence bin (labelled by bin centre), for a histogram"""
+    confidence = np.asarray(confidence, dtype=float)
+    centre = (np.minimum(np.floor(confidence * n_bins), n_bins - 1) + 0.5) / n_bins
+    frame = pd.DataFrame({'Method': np.asarray(methods, dtype=object), 'Confidence': centre}).dropna()
+    return frame.groupby(['Method', 'Confidence']).size().reset_index(name='Count')
+
+
+def faculty_summary(cube):
+    """Total publications and most common category per faculty, largest first"""
+    by_category = counts_by(cube, ['Faculty', 'Category'])
+    primary = by_category.reset_index().drop_duplicates('Faculty')  # already sorted by count
+    totals = counts_by(cube, 'Faculty')
+    stats = pd.DataFrame({
+        'Faculty': totals.index.astype(str),
+        'Total Publications': totals.values,
+        'Primary Category': primary.set_index('Faculty')['Category'].reindex(totals.index).astype(str).values,
+    })
+    return stats
+
+
+def filter_mask(df, years, categories, faculties):
+    """Boolean row mask (by position) for the sidebar filters"""
+    return (
+        df['Year'].isin(years).to_numpy() &
+        df['Category'].isin(categories).to_numpy() &
+        df['Faculty'].isin(faculties).to_numpy()
+    )
+
+
+def filter_rows(df, years, categories, faculties):
+    """Row-level filter, only needed where individual publications are shown"""
+    return df[filter_mask(df, years, categories, faculties)]
+
+
+def sort_orders(values):
+    """Row positions sorted ascending and descending (stable, ties in row order)"""
+    values = values.reset_index(drop=True)
+    return {
+        'Ascending': values.sort_values(kind='stable').index.to_numpy(),
+        'Descending': values.sort_values(ascending=False, kind='stable').index.to_numpy(),
+    }
+
+
+def sorted_positions(order, mask):
+    """Positions of the rows selected by mask, in the given presorted order"""
+    return order[mask[order]]
+
+
+def page_count(n_rows, page_size):
+    """Number of pages needed to show n_rows (at least one)"""
+    return max(1, -(-n_rows // page_size))
+
+
+def page_slice(positions, page, page_size):
+    """Row positions on a 1-based page"""
+    start = (page - 1) * page_size
+    return positions[start:start + page_size]
+
+
+def chunked(positions, chunk_rows):
+    """Split row positions into consecutive chunks (always at least one)"""
+    return np.array_split(positions, page_count(len(positions), chunk_rows))
@@ -0,0 +1,331 @@
+"""Opt-in rerun profiler for the Streamlit dashboard.
+
+Enabled with DASHBOARD_PROFILE=1 in the server's environment, or per browser
+tab with ?profile=1 in the URL. Every rerun - the whole page, or a single
+fragment - then records:
+
+- wall-clock seconds per dashboard section
+- seconds per data operation (filter, groupby, figure, serialize) per section
+- hits and misses of the cached loaders and figure builders
+
+The dashboard shows the last reruns in a sidebar debug panel and appends one
+JSON line per rerun to dashboard_profile.jsonl (DASHBOARD_PROFILE_LOG
+overrides the path). This script aggregates the log into p50/p95 per section:
+
+    python dashboard_profiler.py --log dashboard_profile.jsonl
+"""
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_LOG = 'dashboard_profile.jsonl'
+HISTORY = 20  # reruns kept per session for the debug panel
+
+_local = threading.local()  # each session's script runs on its own thread
+_log_lock = threading.Lock()
+
+
+class RerunProfile:
+    """Section laps, operation times and cache counters of one rerun"""
+
+    def __init__(self, session, kind='page'):
+        self.session = session
+        self.kind = kind
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self.sections = {}
+        self.operations = {}
+        self.cache = {}
+        self._section = None
+        self._lap_start = self._start
+
+    def lap(self, name):
+        """End the current section and start the next one (None: no section)"""
+        now = time.perf_counter()
+        if self._section is not None:
+            self.sections[self._section] = self.sections.get(self._section, 0.0) + now - self._lap_start
+        self._section, self._lap_start = name, now
+
+    @contextmanager
+    def section(self, name):
+        """Time an enclosed section, then resume the one it interrupted"""
+        outer = self._section
+        self.lap(name)
+        try:
+            yield
+        finally:
+            self.lap(outer)
+
+    @contextmanager
+    def operation(self, name):
+        """Time an enclosed data operation within the current section"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            operations = self.operations.setdefault(self._section or 'page', {})
+            operations[name] = operations.get(name, 0.0) + time.perf_counter() - start
+
+    def cache_call(self, loader, hit):
+        counts = self.cache.setdefault(loader, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def finish(self):
+        self.lap(None)
+        self.total_seconds = time.perf_counter() - self._start
+        return self
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'session': self.session,
+            'kind': self.kind,
+            'total_seconds': round(self.total_seconds, 4),
+            'sections': {name: round(seconds, 4) for name, seconds in self.sections.items()},
+            'operations': {section: {name: round(seconds, 4) for name, seconds in operations.items()}
+                           for section, operations in self.operations.items()},
+            'cache': self.cache,
+        }
+
+
+def current():
+    """Profile of the rerun running on this thread, or None when not profiling"""
+    return getattr(_local, 'profile', None)
+
+
+def begin(session, kind='page'):
+    # Replaces the profile of a rerun that was interrupted before it finished
+    _local.profile = RerunProfile(session, kind)
+    return _local.profile
+
+
+def end():
+    profile, _local.profile = current(), None
+    return profile.finish() if profile is not None else None
+
+
+def lap(name):
+    """Start the next top-level section of the page (no-op when not profiling)"""
+    profile = current()
+    if profile is not None:
+        profile.lap(name)
+
+
+@contextmanager
+def operation(name):
+    profile = current()
+    if profile is None:
+        yield
+    else:
+        with profile.operation(name):
+            yield
+
+
+def timed(name):
+    """Decorator timing every call as the named data operation"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            with operation(name):
+                return fn(*args, **kwargs)
+        return call
+    return decorate
+
+
+def profiled_cache(cache, operation_name=None):
+    """Apply a Streamlit cache decorator, counting its hits and misses.
+
+    The wrapped function only runs on a miss, so a call that does not reach it
+    was a hit. With operation_name, calls are also timed as that operation.
+    """
+    def decorate(fn):
+        misses = threading.local()
+
+        @functools.wraps(fn)
+        def compute(*args, **kwargs):
+            misses.count = getattr(misses, 'count', 0) + 1
+            return fn(*args, **kwargs)
+        cached = cache(compute)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            profile = current()
+            if profile is None:
+                return cached(*args, **kwargs)
+            before = getattr(misses, 'count', 0)
+            with operation(operation_name) if operation_name else nullcontext():
+                result = cached(*args, **kwargs)
+            profile.cache_call(fn.__name__, hit=getattr(misses, 'count', 0) == before)
+            return result
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def append_log(record, path=None):
+    """Append one rerun to the JSONL log (shared by every session of the server)"""
+    path = path or os.environ.get('DASHBOARD_PROFILE_LOG', DEFAULT_LOG)
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with _log_lock, open(path, 'a') as f:
+        f.write(line)
+
+
+# ========================================
+# STREAMLIT GLUE
+# ========================================
+def enabled():
+    """Profiling is on for the server (DASHBOARD_PROFILE) or this tab (?profile=1)"""
+    import streamlit as st
+    return (os.environ.get('DASHBOARD_PROFILE', '') not in ('', '0')
+            or st.query_params.get('profile', '0') not in ('', '0'))
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def _fragment_run():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def begin_page():
+    """Start profiling a whole-page rerun, if enabled"""
+    if enabled():
+        begin(_session_id())
+    else:
+        _local.profile = None
+
+
+def record(profile):
+    """Log a finished rerun and keep it in the session's history for the panel"""
+    import streamlit as st
+    entry = profile.to_dict()
+    append_log(entry)
+    history = st.session_state.setdefault('_profile_history', [])
+    history.append(entry)
+    del history[:-HISTORY]
+
+
+def profiled_fragment(name):
+    """Time a fragment as a section of the page, or as its own rerun when it reruns alone"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if _fragment_run():
+                if not enabled():
+                    return fn(*args, **kwargs)
+                begin(_session_id(), kind=name)
+                try:
+                    with current().section(name):
+                        return fn(*args, **kwargs)
+                finally:
+                    record(end())
+            profile = current()
+            if profile is None:
+                return fn(*args, **kwargs)
+            with profile.section(name):
+                return fn(*args, **kwargs)
+        return run
+    return decorate
+
+
+def end_page():
+    """Finish the page rerun's profile, log it and draw the sidebar debug panel"""
+    import streamlit as st
+    profile = end()
+    if profile is None:
+        return
+    record(profile)
+    with st.sidebar.expander("🐞 Performance (last reruns)", expanded=False):
+        history = st.session_state['_profile_history']
+        st.caption(f"Page rerun: {profile.total_seconds * 1000:.0f} ms")
+        st.dataframe(pd.DataFrame({'Section': list(profile.sections),
+                                   'ms': [round(s * 1000, 1) for s in profile.sections.values()]}),
+                     use_container_width=True, hide_index=True)
+        operations = [{'Section': section, 'Operation': name, 'ms': round(seconds * 1000, 1)}
+                      for section, ops in profile.operations.items() for name, seconds in ops.items()]
+        if operations:
+            st.dataframe(pd.DataFrame(operations), use_container_width=True, hide_index=True)
+        if profile.cache:
+            st.dataframe(pd.DataFrame([{'Cached': loader, **counts} for loader, counts in profile.cache.items()]),
+                         use_container_width=True, hide_index=True)
+        fragments = [r for r in history if r['kind'] != 'page']
+        if fragments:
+            st.caption("Fragment reruns since")
+            st.dataframe(pd.DataFrame([{'Fragment': r['kind'], 'ms': round(r['total_seconds'] * 1000, 1)}
+                                       for r in fragments[-10:]]), use_container_width=True, hide_index=True)
+
+
+# ========================================
+# REPORT
+# ========================================
+def load_log(path=DEFAULT_LOG):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentiles(frame, by, column='seconds'):
+    grouped = frame.groupby(by, sort=False)[column]
+    return pd.DataFrame({
+        'runs': grouped.size(),
+        'p50_ms': grouped.quantile(0.5) * 1000,
+        'p95_ms': grouped.quantile(0.95) * 1000,
+        'mean_ms': grouped.mean() * 1000,
+    }).round(1).sort_values('p95_ms', ascending=False)
+
+
+def report(records):
+    """p50/p95 per rerun kind, section and section operation, and cache hit rates"""
+    reruns = pd.DataFrame([{'kind': r['kind'], 'seconds': r['total_seconds']} for r in records])
+    sections = pd.DataFrame([{'section': name, 'seconds': seconds}
+                             for r in records for name, seconds in r['sections'].items()])
+    operations = pd.DataFrame([{'section': section, 'operation': name, 'seconds': seconds}
+                               for r in records for section, ops in r['operations'].items()
+                               for name, seconds in ops.items()])
+    cache = pd.DataFrame([{'cached': loader, **counts} for r in records for loader, counts in r['cache'].items()])
+    if len(cache):
+        cache = cache.groupby('cached')[['hits', 'misses']].sum()
+        cache['hit_rate'] = (cache['hits'] / (cache['hits'] + cache['misses'])).round(3)
+    return {
+        'reruns': _percentiles(reruns, 'kind') if len(reruns) else reruns,
+        'sections': _percentiles(sections, 'section') if len(sections) else sections,
+        'operations': _percentiles(operations, ['section', 'operation']) if len(operations) else operations,
+        'cache': cache,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate the dashboard profile log into p50/p95 per section")
+    parser.add_argument('--log', default=os.environ.get('DASHBOARD_PROFILE_LOG', DEFAULT_LOG))
+    parser.add_argument('--json', help="Also write the aggregates to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"❌ No profile log at {args.log} - run the dashboard with DASHBOARD_PROFILE=1 first")
+        return
+    records = load_log(args.log)
+    print(f"✅ {len(records)} reruns in {args.log}")
+    tables = report(records)
+    for title, table in tables.items():
+        print(f"\n📊 {title.capitalize()}:")
+        print(table.to_string() if len(table) else "   (none)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({title: json.loads(table.reset_index().to_json(orient='records'))
+                       for title, table in tables.items()}, f, indent=2)
+        print(f"\n💾 Aggregates written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
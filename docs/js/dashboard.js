@@ -2,13 +2,9 @@
 
 async function loadDashboard(facultyId, facultyName) {
     try {
-        // Fetch all data
-        const [profile, publications, categories, coiStats] = await Promise.all([
-            fetch(`../data/${facultyId}/profile.json`).then(r => r.json()).catch(() => null),
-            fetch(`../data/${facultyId}/publications.json`).then(r => r.json()).catch(() => []),
-            fetch(`../data/${facultyId}/categories.json`).then(r => r.json()).catch(() => null),
-            fetch(`../data/${facultyId}/coi_stats.json`).then(r => r.json()).catch(() => null)
-        ]);
+        // One bundle per faculty (build_bundles.py); the per-file JSON is the fallback
+        const { profile, publications, categories, coiStats } =
+            await fetchBundle(facultyId).catch(() => fetchFiles(facultyId));
 
         // Store globally for exports
         window.currentFaculty = { facultyId, facultyName, categories, coiStats };
@@ -25,6 +21,46 @@ async function loadDashboard(facultyId, facultyName) {
     }
 }
 
+async function fetchBundle(facultyId) {
+    // The manifest is small and always revalidated; bundle names carry a content hash
+    const manifest = await fetch('../data/manifest.json', { cache: 'no-cache' }).then(r => r.json());
+    const path = manifest.bundles[facultyId];
+    if (!path) throw new Error(`No bundle for ${facultyId}`);
+    const bundle = await fetch(`../data/${path}`).then(r => r.json());
+    return unpackBundle(bundle);
+}
+
+function unpackBundle(bundle) {
+    const { dois, journals, authors } = bundle;
+    const pubs = bundle.publications;
+    const publications = pubs.doi.map((doi, i) => ({
+        doi: dois[doi],
+        title: pubs.title[i],
+        year: pubs.year[i],
+        journal: journals[pubs.journal[i]],
+        authors: pubs.authors[i].map(a => authors[a]),
+        citation_count: pubs.citation_count[i]
+    }));
+    let categories = bundle.categories;
+    if (categories) {
+        categories = {
+            ...categories,
+            categories: categories.categories.map(c => ({ ...c, papers: c.papers.map(p => dois[p]) }))
+        };
+    }
+    return { profile: bundle.profile, publications, categories, coiStats: bundle.coi_stats };
+}
+
+async function fetchFiles(facultyId) {
+    const [profile, publications, categories, coiStats] = await Promise.all([
+        fetch(`../data/${facultyId}/profile.json`).then(r => r.json()).catch(() => null),
+        fetch(`../data/${facultyId}/publications.json`).then(r => r.json()).catch(() => []),
+        fetch(`../data/${facultyId}/categories.json`).then(r => r.json()).catch(() => null),
+        fetch(`../data/${facultyId}/coi_stats.json`).then(r => r.json()).catch(() => null)
+    ]);
+    return { profile, publications, categories, coiStats };
+}
+
 function renderMetrics(profile) {
     if (!profile) return;
     const stats = profile.stats;
@@ -0,0 +1,322 @@
+"""Concurrent, rate-limited generative classification via the chat-completions API.
+
+Replaces the one-blocking-call-per-row loop in the notebook: requests run
+concurrently up to a configurable limit, stay inside request/token per-minute
+budgets, retry transient failures with exponential backoff and can optionally
+pack several publications into one prompt.
+
+Quick offline throughput check against the bundled stub server:
+
+    python generative_classifier.py --stub --count 500 --batch-size 5
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from collections import deque
+
+import httpx
+
+MODEL = 'gpt-4o-mini'
+DEFAULT_BASE_URL = 'https://api.openai.com/v1'
+
+SYSTEM_PROMPT = "You are a materials science expert. Be concise."
+
+PROMPT_TEMPLATE = """You are a materials science expert. Classify this publication into ONE category:
+
+Categories: polymer, biopolymer, metal, ceramic, semiconductor, composite, nano_materials, others
+
+Publication: "{text}"
+
+Respond EXACTLY in this format:
+Category: [name]
+Confidence: [0-100]
+Reason: [one short sentence explaining why]"""
+
+BATCH_PROMPT_TEMPLATE = """You are a materials science expert. Classify each publication below into ONE category:
+
+Categories: polymer, biopolymer, metal, ceramic, semiconductor, composite, nano_materials, others
+
+{items}
+
+Respond EXACTLY in this format for every item, in order:
+Item: [number]
+Category: [name]
+Confidence: [0-100]
+Reason: [one short sentence explaining why]"""
+
+MAX_TOKENS_PER_ITEM = 100
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_ITEM_HEADER = re.compile(r'^\s*Item\s*:?\s*(\d+)\s*:?\s*$', re.IGNORECASE)
+
+
+def prompt_version(model=MODEL):
+    """Hash of everything that shapes a reply: model and prompt templates"""
+    payload = '\x1f'.join([model, SYSTEM_PROMPT, PROMPT_TEMPLATE, BATCH_PROMPT_TEMPLATE])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_prompt(text):
+    """Single-publication prompt (publication text truncated to 500 chars)"""
+    return PROMPT_TEMPLATE.format(text=text[:500])
+
+
+def build_batch_prompt(texts):
+    """One prompt covering several publications, numbered from 1"""
+    items = '\n'.join(f'Item {i}: "{text[:500]}"' for i, text in enumerate(texts, 1))
+    return BATCH_PROMPT_TEMPLATE.format(items=items)
+
+
+def parse_response(result):
+    """Parse a Category/Confidence/Reason block into (category, confidence, explanation)"""
+    lines = result.strip().split('\n')
+
+    category = 'others'
+    confidence = 0.5
+    reason = "No explanation provided"
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('Category:'):
+            category = line.split(':', 1)[1].strip().lower()
+        elif line.startswith('Confidence:'):
+            conf_str = line.split(':', 1)[1].strip().replace('%', '')
+            try:
+                confidence = float(conf_str) / 100.0
+            except ValueError:
+                confidence = 0.5
+        elif line.startswith('Reason:'):
+            reason = line.split(':', 1)[1].strip()
+
+    return category, confidence, f"AI: {reason}"
+
+
+def parse_batch_response(result, count):
+    """Split a batched reply into per-item results; missing items map to None"""
+    blocks = {}
+    current = None
+    for line in result.strip().split('\n'):
+        header = _ITEM_HEADER.match(line)
+        if header:
+            current = int(header.group(1))
+            blocks[current] = []
+        elif current is not None:
+            blocks[current].append(line)
+
+    parsed = []
+    for number in range(1, count + 1):
+        lines = blocks.get(number)
+        if lines and any(line.strip().startswith('Category:') for line in lines):
+            parsed.append(parse_response('\n'.join(lines)))
+        else:
+            parsed.append(None)
+    return parsed
+
+
+def estimate_tokens(prompt, max_tokens):
+    """Rough token cost of a request (~4 characters per token plus the reply budget)"""
+    return (len(SYSTEM_PROMPT) + len(prompt)) // 4 + max_tokens
+
+
+class RateLimiter:
+    """Sliding one-minute budget for requests and tokens"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, window=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = asyncio.Lock()
+
+    def _expire(self, now):
+        while self._events and self._events[0][0] <= now - self.window:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _has_room(self, tokens):
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            return False
+        if (self.tokens_per_minute and self._events
+                and self._tokens_in_window + tokens > self.tokens_per_minute):
+            return False
+        return True
+
+    async def acquire(self, tokens=0):
+        """Wait until one more request of `tokens` fits in the budget"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self._has_room(tokens):
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+                await asyncio.sleep(max(self._events[0][0] + self.window - now, 0.001))
+
+
+class GenerativeClassifier:
+    """Async chat-completions client for classifying many publications at once"""
+
+    def __init__(self, api_key=None, model=MODEL, base_url=None, concurrency=8,
+                 requests_per_minute=None, tokens_per_minute=None, max_retries=5,
+                 backoff=1.0, max_backoff=30.0, batch_size=1, timeout=60.0):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY', '')
+        self.model = model
+        self.base_url = (base_url or os.getenv('OPENAI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.stats = {'api_calls': 0, 'retries': 0, 'errors': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+
+    @property
+    def version(self):
+        return prompt_version(self.model)
+
+    async def _complete(self, client, semaphore, prompt, max_tokens):
+        """POST one chat completion, retrying transient failures; returns the reply text"""
+        payload = {
+            'model': self.model,
+            'messages': [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': prompt}
+            ],
+            'temperature': 0.1,
+            'max_tokens': max_tokens
+        }
+        # One logical call however many attempts it takes; resends are counted as retries
+        self.stats['api_calls'] += 1
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(estimate_tokens(prompt, max_tokens))
+            retry_after = None
+            try:
+                async with semaphore:
+                    response = await client.post('/chat/completions', json=payload)
+                if response.is_success:
+                    body = response.json()
+                    usage = body.get('usage') or {}
+                    self.stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+                    self.stats['completion_tokens'] += usage.get('completion_tokens', 0)
+                    return body['choices'][0]['message']['content']
+                if response.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                retry_after = response.headers.get('retry-after')
+            except httpx.TransportError as e:
+                # A malformed request will not get better by resending it
+                if attempt == self.max_retries or isinstance(e, httpx.LocalProtocolError):
+                    raise
+
+            self.stats['retries'] += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt) * (0.5 + random.random() / 2)
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            await asyncio.sleep(delay)
+        # Only reached when the last attempt got a status raise_for_status lets through
+        raise httpx.HTTPError(f"No successful response after {self.max_retries + 1} attempts")
+
+    async def _classify_one(self, client, semaphore, text):
+        try:
+            reply = await self._complete(client, semaphore, build_prompt(text), MAX_TOKENS_PER_ITEM)
+            return parse_response(reply)
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            self.stats['errors'] += 1
+            print(f"  ⚠️  API Error: {e}")
+            return 'others', 0.0, f"API Error: {str(e)}"
+
+    async def _classify_batch(self, client, semaphore, texts):
+        if len(texts) == 1:
+            return [await self._classify_one(client, semaphore, texts[0])]
+        try:
+            reply = await self._complete(client, semaphore, build_batch_prompt(texts),
+                                         MAX_TOKENS_PER_ITEM * len(texts))
+            parsed = parse_batch_response(reply, len(texts))
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            print(f"  ⚠️  Batch API Error: {e} - retrying items individually")
+            parsed = [None] * len(texts)
+
+        # Items the model skipped or garbled are re-sent on their own
+        missing = [i for i, result in enumerate(parsed) if result is None]
+        retried = await asyncio.gather(*(self._classify_one(client, semaphore, texts[i]) for i in missing))
+        for i, result in zip(missing, retried):
+            parsed[i] = result
+        return parsed
+
+    async def classify_many(self, texts):
+        """Classify texts concurrently; results are returned in input order"""
+        texts = list(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, headers=headers,
+                                     timeout=self.timeout, limits=limits) as client:
+            batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+            results = await asyncio.gather(*(self._classify_batch(client, semaphore, batch) for batch in batches))
+        return [result for batch in results for result in batch]
+
+
+def classify_texts(texts, **kwargs):
+    """Blocking wrapper around GenerativeClassifier.classify_many (not for running event loops)"""
+    return asyncio.run(GenerativeClassifier(**kwargs).classify_many(texts))
+
+
+def classify_generative(text, **kwargs):
+    """OpenAI generative classification with explanation"""
+    return classify_texts([text], **kwargs)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generative classification throughput check")
+    parser.add_argument('--base-url', help="Chat-completions base URL (default: OpenAI or $OPENAI_BASE_URL)")
+    parser.add_argument('--stub', action='store_true', help="Start the local stub server and use it")
+    parser.add_argument('--stub-latency', type=float, default=0.2, help="Stub response latency in seconds")
+    parser.add_argument('--stub-fail-every', type=int, default=0, help="Stub answers every Nth request with 429")
+    parser.add_argument('--count', type=int, default=200, help="Number of synthetic publications")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--rpm', type=int, help="Requests-per-minute budget")
+    parser.add_argument('--tpm', type=int, help="Tokens-per-minute budget")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    server = None
+    if args.stub:
+        from chat_stub_server import start_stub_server
+        server = start_stub_server(latency=args.stub_latency, fail_every=args.stub_fail_every)
+        base_url = f'http://127.0.0.1:{server.server_port}/v1'
+
+    samples = ["gold nanoparticle synthesis", "polymer blend rheology", "stainless steel corrosion",
+               "perovskite solar cell", "theory of supercooling"]
+    texts = [samples[i % len(samples)] + f" study {i}" for i in range(args.count)]
+
+    engine = GenerativeClassifier(api_key='stub' if args.stub else None, base_url=base_url,
+                                  concurrency=args.concurrency, batch_size=args.batch_size,
+                                  requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                                  backoff=0.1 if args.stub else 1.0)
+    start = time.time()
+    results = asyncio.run(engine.classify_many(texts))
+    elapsed = time.time() - start
+
+    print(f"✅ Classified {len(results)} publications in {elapsed:.2f}s "
+          f"({len(results)/elapsed:.1f} pubs/s)")
+    print(f"📊 Stats: {engine.stats}")
+    if server:
+        print(f"🛰️  Stub server: {server.stats}")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
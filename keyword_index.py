@@ -0,0 +1,147 @@
+"""Token -> publication inverted index for differential reclassification.
+
+classify_publications.py keeps this index next to its output
+(production_classifications.index.sqlite): the distinct tokens of every
+publication's text_for_classification, plus the keyword dictionary the output
+was scored with. When MATERIAL_KEYWORDS is edited, the old and new
+dictionaries are diffed phrase by phrase and only the publications containing
+an added, removed or re-categorized phrase are rescored and re-routed; every
+other row keeps its result, which the edit cannot have changed. The recorded
+dictionary is also the one the output's Keyword IDs number.
+"""
+import json
+import os
+import sqlite3
+
+from material_classifier import clean_text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    token           TEXT NOT NULL,
+    publication_id  INTEGER NOT NULL,
+    PRIMARY KEY (token, publication_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_publication ON postings (publication_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT NOT NULL
+);
+"""
+
+# SQLite caps the number of bound parameters per statement
+_CHUNK = 500
+
+
+def index_path_for(csv_path):
+    """Index file written alongside a CSV output"""
+    return os.path.splitext(csv_path)[0] + '.index.sqlite'
+
+
+def phrase_entries(keywords):
+    """Normalized phrase -> sorted (category, weight) entries, as KeywordMatcher scores them"""
+    entries = {}
+    for category, category_keywords in keywords.items():
+        for keyword in category_keywords:
+            phrase = ' '.join(clean_text(keyword).split())
+            if phrase:
+                entries.setdefault(phrase, []).append((category, len(keyword.split())))
+    return {phrase: sorted(found) for phrase, found in entries.items()}
+
+
+def changed_phrases(old, new):
+    """Phrases whose scoring differs between two dictionaries.
+
+    None when the categories themselves (or their order, which breaks ties)
+    changed - then every publication has to be rescored.
+    """
+    if list(old) != list(new):
+        return None
+    old_entries, new_entries = phrase_entries(old), phrase_entries(new)
+    return {phrase for phrase in set(old_entries) | set(new_entries)
+            if old_entries.get(phrase) != new_entries.get(phrase)}
+
+
+class KeywordIndex:
+    """SQLite postings of tokens per publication plus the dictionary they were scored with"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+        self.conn.commit()
+
+    def keywords(self):
+        """Dictionary the indexed output was scored with, or None when unknown"""
+        return self._get('keywords')
+
+    def set_keywords(self, keywords):
+        self._set('keywords', keywords)
+
+    def complete(self):
+        """True once every publication of the output is indexed"""
+        return bool(self._get('complete'))
+
+    def mark_complete(self):
+        self._set('complete', True)
+
+    def clear(self):
+        self.conn.execute("DELETE FROM postings")
+        self.conn.execute("DELETE FROM meta")
+        self.conn.commit()
+
+    def update(self, publication_ids, texts):
+        """Replace the postings of the given publications with the tokens of their texts"""
+        publication_ids = [int(i) for i in publication_ids]
+        for start in range(0, len(publication_ids), _CHUNK):
+            chunk = publication_ids[start:start + _CHUNK]
+            self.conn.execute(f"DELETE FROM postings WHERE publication_id IN ({','.join('?' * len(chunk))})",
+                              chunk)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO postings VALUES (?, ?)",
+            ((token, publication_id) for publication_id, text in zip(publication_ids, texts)
+             for token in set(str(text).split())))
+        self.conn.commit()
+
+    def publications_with(self, phrases):
+        """Ids of publications containing every token of at least one phrase (a superset of the matches)"""
+        found = set()
+        for phrase in phrases:
+            candidates = None
+            for token in phrase.split():
+                ids = {row[0] for row in self.conn.execute(
+                    "SELECT publication_id FROM postings WHERE token = ?", (token,))}
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            found |= candidates or set()
+        return found
+
+    def stats(self):
+        publications, postings = self.conn.execute(
+            "SELECT COUNT(DISTINCT publication_id), COUNT(*) FROM postings").fetchone()
+        return {'publications': publications, 'postings': postings}
+
+
+def scored_keywords(csv_path):
+    """Dictionary an output's Keyword IDs refer to, as recorded in its index (None without one)"""
+    path = index_path_for(csv_path)
+    if not os.path.exists(path):
+        return None
+    with KeywordIndex(path) as index:
+        return index.keywords()
@@ -0,0 +1,223 @@
+"""Load test: many concurrent sessions against one dashboard server.
+
+Writes a synthetic classification output, starts `streamlit run` on it and,
+for each session count, connects that many browser-less clients over the
+Streamlit websocket. Every session opens the page and then reruns it several
+times, each time changing the year filter, the table's faculty filter or the
+search box - a room of people clicking around at once.
+
+Reported per session count (each on a fresh server): server resident memory
+once a first session has loaded the data and searched, peak resident memory
+while all sessions rerun, the peak growth per session, and rerun latency
+(p50/p95).
+
+    python load_test_dashboard.py --rows 100000 --sessions 1 8 32 --reruns 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import pandas as pd
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from benchmark_data_loading import synthetic_classifications
+from classification_store import write_parquet
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'classification_dashboard.py')
+SEARCHES = ['alloy', 'thin film', 'polymer', 'nano', '']
+
+
+def write_output(n_rows, directory):
+    """Synthetic CSV + Parquet output where the dashboard looks for it"""
+    df = synthetic_classifications(n_rows)
+    df.to_csv(os.path.join(directory, 'production_classifications.csv'), index=False)
+    write_parquet(df, os.path.join(directory, 'production_classifications.parquet'))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory, port, timeout=60):
+    """`streamlit run` of the dashboard in directory, once it answers its health check"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', DASHBOARD, '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Dashboard server did not start on port {port}")
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+class Session:
+    """One browser tab: reruns the script with widget changes and waits for it to finish"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}  # label -> widget proto of the last run
+        self.fragments = {}  # widget id -> id of the fragment that drew it
+
+    async def rerun(self, changes=()):
+        """Rerun with (widget, field, value) changes; returns seconds until the script finished"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        # Like the browser: a change to a widget inside a fragment reruns only that fragment
+        fragments = {self.fragments.get(widget.id) for widget, _, _ in changes}
+        if len(fragments) == 1 and None not in fragments:
+            msg.rerun_script.fragment_id = fragments.pop()
+        for widget, field, value in changes:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget.id
+            if field == 'string_array_value':
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(f"Dashboard raised: {element.exception.message}")
+                widget = getattr(element, element.WhichOneof('type'))
+                if getattr(widget, 'id', '') and hasattr(widget, 'label'):
+                    self.widgets[widget.label] = widget
+                    if forward.delta.fragment_id:
+                        self.fragments[widget.id] = forward.delta.fragment_id
+            elif kind == 'script_finished':
+                return time.perf_counter() - start
+
+    def interaction(self, rng):
+        """A random widget change, among the widgets the last run showed"""
+        years = self.widgets['Select Years']
+        table_faculty = self.widgets.get('👤 Filter by Faculty:')
+        search = next((w for label, w in self.widgets.items() if label.startswith('🔍 Search')), None)
+        action = rng.randrange(3) if table_faculty is not None and search is not None else 0
+        if action == 0:
+            options = list(years.options)
+            return [(years, 'string_array_value', rng.sample(options, rng.randint(1, len(options))))]
+        if action == 1:
+            return [(table_faculty, 'string_value', rng.choice(list(table_faculty.options)))]
+        return [(search, 'string_value', rng.choice(SEARCHES))]
+
+
+def connect(port):
+    return websockets.connect(f'ws://localhost:{port}/_stcore/stream', max_size=None, subprotocols=['streamlit'])
+
+
+async def session(port, seed, reruns):
+    """Open the page, then rerun it with random interactions; returns the rerun latencies"""
+    rng = random.Random(seed)
+    async with connect(port) as ws:
+        tab = Session(ws)
+        await tab.rerun()
+        return [await tab.rerun(tab.interaction(rng)) for _ in range(reruns)]
+
+
+async def warm_up(port):
+    """Load the data and build the shared search index, as the first visitor of the day would"""
+    async with connect(port) as ws:
+        tab = Session(ws)
+        await tab.rerun()
+        search = next(w for label, w in tab.widgets.items() if label.startswith('🔍 Search'))
+        await tab.rerun([(search, 'string_value', SEARCHES[0])])
+
+
+async def measure(port, pid, sessions, reruns):
+    peak = 0.0
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, rss_mb(pid))
+            await asyncio.sleep(0.01)
+
+    # One session loads the data (and warms every cache) before the others arrive
+    start = time.perf_counter()
+    await warm_up(port)
+    first_load = time.perf_counter() - start
+    baseline = rss_mb(pid)
+
+    sampler = asyncio.create_task(sample())
+    results = await asyncio.gather(*(session(port, seed, reruns) for seed in range(sessions)))
+    sampler.cancel()
+    return {'first_load': first_load, 'baseline_mb': baseline, 'peak_mb': max(peak, rss_mb(pid)),
+            'latencies': [t for latencies in results for t in latencies]}
+
+
+def run_sessions(directory, sessions, reruns):
+    """Measurements of one session count, on a fresh server"""
+    port = free_port()
+    server = start_server(directory, port)
+    try:
+        return asyncio.run(measure(port, server.pid, sessions, reruns))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit dashboard")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows of the synthetic classification output")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--reruns', type=int, default=5, help="Widget interactions per session")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        write_output(args.rows, tmp)
+        print(f"✅ Synthetic output: {args.rows:,} rows")
+        for sessions in args.sessions:
+            measured = run_sessions(tmp, sessions, args.reruns)
+            latencies = pd.Series(measured['latencies'])
+            growth = measured['peak_mb'] - measured['baseline_mb']
+            results.append({
+                'sessions': sessions,
+                'reruns': len(latencies),
+                'first_load_s': round(measured['first_load'], 2),
+                'baseline_mb': round(measured['baseline_mb'], 1),
+                'peak_mb': round(measured['peak_mb'], 1),
+                'mb_per_session': round(growth / sessions, 2),
+                'rerun_p50_s': round(latencies.quantile(0.5), 3),
+                'rerun_p95_s': round(latencies.quantile(0.95), 3),
+            })
+            print(f"   ✅ {sessions} sessions: peak {measured['peak_mb']:.0f} MB, "
+                  f"p95 rerun {latencies.quantile(0.95):.2f}s")
+
+    print("\n📊 Results:")
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""CPU-only learned tier between the rule-based and generative classifiers.
+
+A multinomial logistic regression over hashed word unigrams and bigrams,
+trained on the generative labels already stored in the classification cache.
+Probabilities are calibrated with a single temperature fitted on held-out
+labels, so "confidence" can be thresholded the same way as the rule-based one.
+In classify_publications.py (--local-model), publications the rule-based tier
+is unsure about go to this model first; the API only sees the ones it is also
+unsure about.
+
+Train (or refresh) from the database and cache, with an offline report of API
+calls saved versus agreement with the generative labels on a held-out split:
+
+    python local_classifier.py --sqlite demo.sqlite --model local_classifier.npz --report local_report.json
+"""
+import argparse
+import hashlib
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+from scipy import optimize, sparse
+
+N_FEATURES = 2 ** 18
+DEFAULT_MODEL = 'local_classifier.npz'
+DEFAULT_THRESHOLD = 0.9
+REPORT_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+def _tokens(text):
+    words = str(text).split()
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+class FeatureHasher:
+    """Texts -> L2-normalized, sublinear-tf hashed n-gram rows (CSR)"""
+
+    def __init__(self, n_features=N_FEATURES):
+        self.n_features = n_features
+        self._columns = {}  # token -> column, so each distinct token is hashed once
+
+    def column(self, token):
+        column = self._columns.get(token)
+        if column is None:
+            column = self._columns[token] = zlib.crc32(token.encode('utf-8')) % self.n_features
+        return column
+
+    def transform(self, texts):
+        columns, indptr = [], [0]
+        for text in texts:
+            columns.extend(self.column(token) for token in _tokens(text))
+            indptr.append(len(columns))
+        rows = sparse.csr_matrix((np.ones(len(columns), dtype=np.float32), np.array(columns, dtype=np.int32),
+                                  np.array(indptr, dtype=np.int64)), shape=(len(indptr) - 1, self.n_features))
+        rows.sum_duplicates()
+        rows.data = 1 + np.log(rows.data)
+        norms = np.sqrt(np.asarray(rows.multiply(rows).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.where(norms > 0, norms, 1)).dot(rows).tocsr()
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def fit_weights(features, targets, n_classes, l2=1e-3, max_iter=200):
+    """Softmax regression weights (features x classes) and bias by L-BFGS"""
+    # Weights of hash columns no training text uses stay at zero, so only the used ones are optimized
+    n_features = features.shape[1]
+    used = np.unique(features.indices)
+    features = features[:, used]
+    n_rows, n_used = features.shape
+    onehot = np.eye(n_classes)[targets]
+
+    def loss(params):
+        weights = params[:-n_classes].reshape(n_used, n_classes)
+        bias = params[-n_classes:]
+        probs = softmax(features @ weights + bias)
+        nll = -np.log(probs[np.arange(n_rows), targets] + 1e-12).mean()
+        error = (probs - onehot) / n_rows
+        grad_weights = features.T @ error + l2 * weights
+        return nll + l2 / 2 * (weights ** 2).sum(), np.concatenate([grad_weights.ravel(), error.sum(axis=0)])
+
+    start = np.zeros(n_used * n_classes + n_classes)
+    result = optimize.minimize(loss, start, jac=True, method='L-BFGS-B', options={'maxiter': max_iter})
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    weights[used] = result.x[:-n_classes].reshape(n_used, n_classes)
+    return weights, result.x[-n_classes:]
+
+
+def fit_temperature(logits, targets):
+    """Temperature minimizing held-out negative log-likelihood"""
+    def nll(temperature):
+        probs = softmax(logits / temperature)
+        return -np.log(probs[np.arange(len(targets)), targets] + 1e-12).mean()
+    return optimize.minimize_scalar(nll, bounds=(0.05, 20), method='bounded').x
+
+
+class LocalClassifier:
+    """Calibrated hashed-n-gram logistic regression over the material categories"""
+
+    def __init__(self, classes, weights, bias, temperature=1.0):
+        self.classes = np.asarray(classes, dtype=object)
+        self.weights = weights
+        self.bias = bias
+        self.temperature = float(temperature)
+        self.hasher = FeatureHasher(weights.shape[0])
+        digest = hashlib.sha256(weights.tobytes() + bias.tobytes() + str(self.temperature).encode())
+        self.version = digest.hexdigest()[:16]
+
+    @classmethod
+    def train(cls, texts, labels, calibration_share=0.2, l2=1e-3, seed=0):
+        """Fit on the labelled texts, with the temperature calibrated on a held-out share"""
+        texts, labels = list(texts), np.asarray(labels, dtype=object)
+        classes, targets = np.unique(labels, return_inverse=True)
+        hasher = FeatureHasher()
+        features = hasher.transform(texts)
+
+        order = np.random.default_rng(seed).permutation(len(texts))
+        n_calibration = int(len(texts) * calibration_share)
+        calibration, fit = order[:n_calibration], order[n_calibration:]
+        temperature = 1.0
+        if n_calibration:
+            weights, bias = fit_weights(features[fit], targets[fit], len(classes), l2)
+            temperature = fit_temperature(features[calibration] @ weights + bias, targets[calibration])
+
+        # The final model sees every label; the temperature carries over
+        weights, bias = fit_weights(features, targets, len(classes), l2)
+        return cls(classes, weights, bias, temperature)
+
+    def predict_proba(self, texts):
+        return softmax((self.hasher.transform(texts) @ self.weights + self.bias) / self.temperature)
+
+    def classify(self, texts):
+        """DataFrame of category, confidence and explanation, in the order of texts"""
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        confidence = probs[np.arange(len(best)), best]
+        return pd.DataFrame({
+            'category': self.classes[best],
+            'confidence': confidence,
+            'explanation': [f"Local model: {c:.1%} {k}" for c, k in zip(confidence, self.classes[best])],
+        }, index=texts.index if isinstance(texts, pd.Series) else None)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, classes=self.classes.astype(str), weights=self.weights, bias=self.bias,
+                                temperature=self.temperature)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['classes'].astype(object), data['weights'], data['bias'], data['temperature'])
+
+
+def evaluation_report(model, texts, labels, rule_confidence, api_threshold=0.85, thresholds=REPORT_THRESHOLDS):
+    """API-call reduction versus agreement with the generative labels, per local threshold.
+
+    Only publications the rule-based tier would send to the API count: of those,
+    `local_share` are answered locally at the threshold (API calls saved) and
+    `local_agreement` is how often the local label matches the generative one.
+    """
+    texts, labels = list(texts), np.asarray(labels, dtype=object)
+    routed = np.asarray(rule_confidence) < api_threshold
+    result = model.classify(texts)
+    confidence = result['confidence'].to_numpy()[routed]
+    agrees = (result['category'].to_numpy() == labels)[routed]
+    rows = []
+    for threshold in thresholds:
+        local = confidence >= threshold
+        rows.append({
+            'local_threshold': threshold,
+            'api_candidates': int(routed.sum()),
+            'local_share': float(local.mean()) if len(local) else 0.0,
+            'api_calls': int((~local).sum()),
+            'local_agreement': float(agrees[local].mean()) if local.any() else None,
+        })
+    return {'accuracy': float(agrees.mean()) if len(agrees) else None, 'thresholds': rows}
+
+
+def labelled_texts(args):
+    """text_for_classification and cached generative label of every labelled publication"""
+    from classification_cache import ClassificationCache
+    from classify_publications import build_query, connect, prepare_frame
+    from generative_classifier import prompt_version
+
+    query, params = build_query(sqlite=bool(args.sqlite), from_year=None, to_year=None)
+    conn = connect(args.sqlite)
+    try:
+        df = pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+    texts = prepare_frame(df)['text_for_classification'].drop_duplicates().reset_index(drop=True)
+    with ClassificationCache(args.cache) as cache:
+        labels = cache.get_many('generative', prompt_version(), texts, count=False)
+    labelled = sorted(i for i, (_, _, explanation) in labels.items() if not explanation.startswith('API Error'))
+    return texts[labelled].reset_index(drop=True), [labels[i][0] for i in labelled]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local classifier tier on cached generative labels")
+    parser.add_argument('--sqlite', help="Use a SQLite stand-in database instead of MySQL")
+    parser.add_argument('--cache', default='classification_cache.sqlite')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Where to save the trained model")
+    parser.add_argument('--report', help="Also write the evaluation report to this JSON file")
+    parser.add_argument('--test-share', type=float, default=0.2, help="Labels held out for the evaluation report")
+    parser.add_argument('--l2', type=float, default=1e-3)
+    args = parser.parse_args()
+
+    from material_classifier import classify_series
+
+    texts, labels = labelled_texts(args)
+    if len(set(labels)) < 2:
+        print(f"❌ Need generative labels of at least two categories in {args.cache} (found {len(labels)} labels)")
+        return
+    print(f"✅ {len(texts)} publications with cached generative labels")
+
+    # Offline evaluation on labels the evaluated model never saw
+    order = np.random.default_rng(0).permutation(len(texts))
+    n_test = int(len(texts) * args.test_share)
+    test, train = order[:n_test], order[n_test:]
+    held_out = LocalClassifier.train(texts[train], np.asarray(labels, dtype=object)[train], l2=args.l2)
+    rule_confidence = classify_series(texts[test])['confidence'].to_numpy()
+    report = evaluation_report(held_out, texts[test], np.asarray(labels, dtype=object)[test], rule_confidence)
+    report.update(train_rows=len(train), test_rows=len(test), temperature=held_out.temperature)
+
+    print(f"\n📊 Held-out evaluation ({len(test)} publications, accuracy {report['accuracy'] or 0:.1%}):")
+    table = pd.DataFrame(report['thresholds'])
+    print(table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    model = LocalClassifier.train(texts, labels, l2=args.l2)
+    model.save(args.model)
+    print(f"\n💾 Model ({len(model.classes)} categories, version {model.version}) written to {args.model}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
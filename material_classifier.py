@@ -0,0 +1,310 @@
+"""Rule-based material classification shared by the notebook and batch scripts."""
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Material keywords dictionary (145 keywords)
+MATERIAL_KEYWORDS = {
+    'polymer': [
+        'polymer', 'polymers', 'polymeric', 'polymerization',
+        'plastic', 'plastics', 'resin', 'elastomer', 'thermoplastic',
+        'polystyrene', 'polyethylene', 'polypropylene', 'pvc', 'pet',
+        'polyester', 'nylon', 'acrylic', 'epoxy', 'silicone',
+        'hydrogel', 'copolymer', 'macromolecule', 'monomer'
+    ],
+    'biopolymer': [
+        'biopolymer', 'chitosan', 'cellulose', 'collagen', 'gelatin',
+        'alginate', 'protein', 'peptide', 'dna', 'rna',
+        'polysaccharide', 'starch', 'lignin', 'silk', 'keratin',
+        'fibrin', 'elastin', 'hyaluronic', 'pectin', 'biobased'
+    ],
+    'metal': [
+        'metal', 'metallic', 'alloy', 'steel', 'iron',
+        'aluminum', 'copper', 'titanium', 'nickel', 'zinc',
+        'magnesium', 'silver', 'gold', 'platinum', 'cobalt',
+        'chromium', 'manganese', 'brass', 'bronze', 'stainless'
+    ],
+    'ceramic': [
+        'ceramic', 'ceramics', 'oxide', 'oxides', 'glass',
+        'silica', 'alumina', 'zirconia', 'titania', 'silicon dioxide',
+        'calcium phosphate', 'hydroxyapatite', 'bioactive glass',
+        'porcelain', 'clay', 'mullite', 'spinel', 'perovskite'
+    ],
+    'semiconductor': [
+        'semiconductor', 'silicon', 'transistor', 'diode', 'chip',
+        'wafer', 'doping', 'n-type', 'p-type', 'junction',
+        'cmos', 'mosfet', 'gallium arsenide', 'germanium',
+        'led', 'photovoltaic', 'solar cell', 'bandgap', 'quantum dot'
+    ],
+    'composite': [
+        'composite', 'composites', 'fiber reinforced', 'laminate',
+        'carbon fiber', 'glass fiber', 'fiberglass', 'hybrid material',
+        'sandwich structure', 'matrix', 'reinforcement', 'filler',
+        'multiphase', 'particulate composite', 'nanocomposite'
+    ],
+    'nano_materials': [
+        'nanoparticle', 'nanoparticles', 'gold nanoparticle', 'silver nanoparticle',
+        'metal nanoparticle', 'quantum dot', 'nanodot', 'colloidal',
+        'plasmonic', 'nanosphere', 'nanocrystal', 'nanorod', 'nanoshell',
+        'nanofiber', 'nanofibers', 'electrospinning', 'electrospun',
+        'nanostructure', 'nanostructured', 'nanowire', 'nanotube',
+        'carbon nanotube', 'cnt', 'graphene', 'nanomesh', 'nanonet',
+        'fibrous', 'nanofibrous', 'ultrafine fiber'
+    ]
+}
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def prepare_text(row):
+    """Combine title and keywords - NO duplication"""
+    text_parts = []
+
+    # Add title
+    if pd.notna(row['title']) and str(row['title']).strip():
+        text_parts.append(str(row['title']).strip())
+
+    # Add keywords
+    if pd.notna(row['keywords']) and str(row['keywords']).strip():
+        try:
+            kw_str = str(row['keywords'])
+            if kw_str.startswith('['):
+                keywords_data = json.loads(kw_str)
+                if isinstance(keywords_data, list):
+                    keywords_text = ' '.join(str(k) for k in keywords_data if k)
+                    if keywords_text.strip():
+                        text_parts.append(keywords_text)
+            elif kw_str not in ['null', 'None', '[]', '']:
+                text_parts.append(kw_str)
+        except ValueError:
+            pass
+
+    return ' '.join(text_parts)
+
+
+def prepare_texts(df):
+    """Cleaned prepare_text() of every row, without DataFrame.apply's per-row Series"""
+    rows = df[['title', 'keywords']].to_dict('records')
+    return pd.Series([clean_text(prepare_text(row)) for row in rows], index=df.index, dtype=object)
+
+
+def clean_text(text):
+    """Lowercase text and replace punctuation with spaces"""
+    return _PUNCTUATION.sub(' ', text.lower())
+
+
+def keywords_version(keywords=MATERIAL_KEYWORDS):
+    """Short content hash of a keyword dictionary (order matters for tie-breaking)"""
+    payload = json.dumps(keywords, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def keyword_entries(keywords=MATERIAL_KEYWORDS):
+    """(category, keyword) per keyword id, numbered as KeywordMatcher numbers them"""
+    return [(category, keyword) for category, category_keywords in keywords.items()
+            for keyword in category_keywords]
+
+
+def keyword_id_map(old, new=MATERIAL_KEYWORDS):
+    """Keyword ids under `old` -> ids of the same entries under `new` (-1 where removed)"""
+    new_ids = {entry: keyword_id for keyword_id, entry in enumerate(keyword_entries(new))}
+    return np.array([new_ids.get(entry, -1) for entry in keyword_entries(old)], dtype=int)
+
+
+class KeywordMatcher:
+    """Keyword dictionary compiled into a single phrase lookup table.
+
+    Keywords are normalized with the same cleaning as the publication text and
+    matched on whole tokens, so "led" no longer hits inside "called" and each
+    text is scored in one pass regardless of how many keywords there are.
+    """
+
+    def __init__(self, keywords=MATERIAL_KEYWORDS):
+        self.categories = list(keywords)
+        self.entries = []   # keyword id -> (category, keyword)
+        self.weights = []   # keyword id -> weight (multi-word phrases score higher)
+        self._phrases = {}  # normalized phrase -> keyword ids
+        self._phrase_starts = set()  # first tokens of multi-word phrases
+        for category, category_keywords in keywords.items():
+            for keyword in category_keywords:
+                keyword_id = len(self.entries)
+                self.entries.append((category, keyword))
+                self.weights.append(len(keyword.split()))
+                phrase = ' '.join(clean_text(keyword).split())
+                if phrase:
+                    self._phrases.setdefault(phrase, []).append(keyword_id)
+                    if ' ' in phrase:
+                        self._phrase_starts.add(phrase.split()[0])
+        self.max_words = max((len(p.split()) for p in self._phrases), default=1)
+        self.version = keywords_version(keywords)
+
+    def match(self, text):
+        """Return the sorted ids of every dictionary keyword present in text"""
+        if not text:
+            return []
+        tokens = clean_text(text).split()
+        found = set()
+        phrases = self._phrases
+        for start, token in enumerate(tokens):
+            keyword_ids = phrases.get(token)
+            if keyword_ids:
+                found.update(keyword_ids)
+            if token in self._phrase_starts:
+                for end in range(start + 2, min(start + self.max_words, len(tokens)) + 1):
+                    keyword_ids = phrases.get(' '.join(tokens[start:end]))
+                    if keyword_ids:
+                        found.update(keyword_ids)
+        return sorted(found)
+
+    def scores(self, text):
+        """Weighted score and matched keywords per category (dictionary order)"""
+        category_scores = {}
+        category_keywords_found = {}
+        for keyword_id in self.match(text):
+            category, keyword = self.entries[keyword_id]
+            category_scores[category] = category_scores.get(category, 0) + self.weights[keyword_id]
+            category_keywords_found.setdefault(category, []).append(keyword)
+        ordered = [c for c in self.categories if c in category_scores]
+        return ({c: category_scores[c] for c in ordered},
+                {c: category_keywords_found[c] for c in ordered})
+
+    @property
+    def weight_matrix(self):
+        """Sparse keyword x category matrix holding each keyword's weight"""
+        category_index = {c: i for i, c in enumerate(self.categories)}
+        columns = [category_index[category] for category, _ in self.entries]
+        return sparse.csr_matrix(
+            (self.weights, (np.arange(len(self.entries)), columns)),
+            shape=(len(self.entries), len(self.categories)))
+
+    def match_matrix(self, texts):
+        """Sparse document x keyword 0/1 matrix of keyword matches"""
+        indptr = [0]
+        indices = []
+        for text in texts:
+            indices.extend(self.match(text))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr),
+                                 shape=(len(indptr) - 1, len(self.entries)))
+
+    def best_keywords(self, matches, best):
+        """(row, keyword id) pairs of each row's best-category keywords, longest phrases first"""
+        keyword_category = np.array([self.categories.index(c) for c, _ in self.entries], dtype=int)
+        keyword_weight = np.asarray(self.weights)
+        matches = matches.tocoo()
+        in_best = keyword_category[matches.col] == best[matches.row]
+        rows, cols = matches.row[in_best], matches.col[in_best]
+        order = np.lexsort((cols, -keyword_weight[cols], rows))
+        return rows[order], cols[order]
+
+    def score_series(self, texts):
+        """Score a whole Series; returns one column of weighted scores per category"""
+        scores = (self.match_matrix(texts) @ self.weight_matrix).toarray()
+        return pd.DataFrame(scores, index=texts.index, columns=self.categories)
+
+
+_default_matcher = KeywordMatcher()
+
+
+def classify_rule_based(text, threshold=0.4, matcher=None):
+    """Rule-based classification with weighted scoring"""
+    if not text or text.strip() == '':
+        return 'others', 0.0, "No text content found"
+
+    matcher = matcher or _default_matcher
+    category_scores, category_keywords_found = matcher.scores(text)
+
+    if not category_scores:
+        return 'others', 0.0, "No material keywords detected"
+
+    # Calculate confidence
+    total_score = sum(category_scores.values())
+    best_category = max(category_scores.items(), key=lambda x: x[1])
+    confidence = best_category[1] / total_score
+
+    # Create explanation
+    best_cat_name = best_category[0]
+    keywords_found = category_keywords_found[best_cat_name]
+    keyword_count = len(keywords_found)
+
+    # Get top 3 most important keywords (longer phrases first)
+    top_keywords = sorted(keywords_found, key=lambda x: len(x.split()), reverse=True)[:3]
+    keywords_str = ', '.join(top_keywords)
+
+    explanation = f"Confidence: {confidence:.1%} | Found {keyword_count} keywords: {keywords_str}"
+
+    if confidence < threshold:
+        return 'others', confidence, f"Low confidence ({confidence:.1%}) - ambiguous material type"
+
+    return best_category[0], confidence, explanation
+
+
+def score_series(texts, matcher=None):
+    """Raw weighted keyword score per category for a Series of prepared texts"""
+    return (matcher or _default_matcher).score_series(texts)
+
+
+def classify_series(texts, threshold=0.4, matcher=None, details=False):
+    """Rule-based classification of a whole Series of prepared texts.
+
+    Vectorized equivalent of calling classify_rule_based on every element:
+    matches are collected into a sparse document x keyword matrix and scored
+    against the keyword x category weights in one multiplication.
+
+    With details, the result also holds the raw score of every category (one
+    column each, as score_series) and a 'keyword_ids' column listing the ids
+    of the best category's keywords in the order the explanation names them.
+    """
+    matcher = matcher or _default_matcher
+    matches = matcher.match_matrix(texts)
+    scores = (matches @ matcher.weight_matrix).toarray()
+
+    total = scores.sum(axis=1)
+    best = scores.argmax(axis=1)
+    best_score = scores[np.arange(len(scores)), best]
+    confidence = np.divide(best_score, total, out=np.zeros(len(scores)), where=total > 0)
+
+    # Keywords of the winning category, longest phrases first, dictionary order within ties
+    rows, cols = matcher.best_keywords(matches, best)
+    keyword_count = np.bincount(rows, minlength=len(scores))
+    rank = np.arange(len(rows)) - np.repeat(np.cumsum(keyword_count) - keyword_count, keyword_count)
+    keyword_names = np.array([keyword for _, keyword in matcher.entries], dtype=object)
+    keywords_str = np.full(len(scores), '', dtype=object)
+    for position in range(3):
+        at = rank == position
+        separator = ', ' if position else ''
+        keywords_str[rows[at]] = keywords_str[rows[at]] + separator + keyword_names[cols[at]]
+
+    confidence_pct = np.char.mod('%.1f%%', confidence * 100).astype(object)
+    explanation = ("Confidence: " + confidence_pct + " | Found " + keyword_count.astype(str).astype(object)
+                   + " keywords: " + keywords_str)
+    category = np.asarray(matcher.categories, dtype=object)[best]
+
+    low = confidence < threshold
+    category[low] = 'others'
+    explanation[low] = "Low confidence (" + confidence_pct[low] + ") - ambiguous material type"
+
+    no_keywords = total == 0
+    category[no_keywords] = 'others'
+    explanation[no_keywords] = "No material keywords detected"
+
+    no_text = np.array([not text or not str(text).strip() for text in texts], dtype=bool)
+    category[no_text] = 'others'
+    explanation[no_text] = "No text content found"
+
+    result = pd.DataFrame({
+        'category': category,
+        'confidence': confidence,
+        'explanation': explanation,
+    }, index=texts.index)
+    if details:
+        for position, name in enumerate(matcher.categories):
+            result[name] = scores[:, position]
+        bounds = np.cumsum(keyword_count)[:-1]
+        result['keyword_ids'] = [ids.tolist() for ids in np.split(cols, bounds)] if len(scores) else []
+    return result
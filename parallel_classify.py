@@ -0,0 +1,83 @@
+"""Process-pool execution of text preparation and rule-based classification.
+
+prepare_text/clean_text and the keyword matcher are pure-Python and CPU-bound,
+so a single process leaves the rest of a multi-core batch host idle. ShardPool
+splits the publications into contiguous shards, runs each one in a worker
+process and concatenates the results in shard order, so the output is
+identical to the single-process path. Each worker compiles the keyword
+dictionary once, in its initializer; tasks only carry their shard's columns.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from material_classifier import MATERIAL_KEYWORDS, KeywordMatcher, classify_series, prepare_texts
+
+# Below this many rows per worker the pickling round trip costs more than it saves
+MIN_SHARD_ROWS = 2_000
+
+_worker_matcher = None
+
+
+def _init_worker(keywords):
+    global _worker_matcher
+    _worker_matcher = KeywordMatcher(keywords)
+
+
+def _classify_shard(texts, threshold, details):
+    return classify_series(texts, threshold, _worker_matcher, details)
+
+
+def _score_shard(texts):
+    return _worker_matcher.score_series(texts)
+
+
+class ShardPool:
+    """Worker processes that each hold a compiled KeywordMatcher"""
+
+    def __init__(self, workers=None, keywords=MATERIAL_KEYWORDS, min_shard_rows=MIN_SHARD_ROWS):
+        self.workers = workers or os.cpu_count()
+        self.min_shard_rows = min_shard_rows
+        self.matcher = KeywordMatcher(keywords)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(keywords,))
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def shards(self, frame):
+        """Contiguous slices of frame, a few per worker so stragglers even out"""
+        n_shards = min(self.workers * 4, len(frame) // self.min_shard_rows)
+        if n_shards < 2:
+            return [frame]
+        bounds = np.linspace(0, len(frame), n_shards + 1, dtype=int)
+        return [frame.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def prepare_texts(self, df):
+        """text_for_classification for every row of df, in row order"""
+        shards = self.shards(df[['title', 'keywords']])
+        if len(shards) == 1:
+            return prepare_texts(shards[0])
+        return pd.concat(self.executor.map(prepare_texts, shards))
+
+    def classify_series(self, texts, threshold=0.4, details=False):
+        """classify_series over the pool, results in the order of texts"""
+        shards = self.shards(pd.Series(texts))
+        if len(shards) == 1:
+            return classify_series(shards[0], threshold, self.matcher, details)
+        return pd.concat(self.executor.map(_classify_shard, shards, [threshold] * len(shards),
+                                           [details] * len(shards)))
+
+    def score_series(self, texts):
+        """KeywordMatcher.score_series over the pool, rows in the order of texts"""
+        shards = self.shards(pd.Series(texts))
+        if len(shards) == 1:
+            return self.matcher.score_series(shards[0])
+        return pd.concat(self.executor.map(_score_shard, shards))
@@ -0,0 +1,56 @@
+"""Per-stage timings and API usage recorded by classify_publications.py.
+
+Every run writes classification_metrics.json; the dashboard's "Classification
+System Performance" panel reads it instead of quoting fixed figures.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_METRICS = 'classification_metrics.json'
+
+
+class RunMetrics:
+    """Wall-clock seconds per pipeline stage plus counters for one run"""
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block; repeated stages accumulate"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, **counts):
+        self.counts.update(counts)
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            # Wall-clock time of the run; streamed stages overlap, so this can be
+            # less than the sum of the stage times
+            'total_seconds': round(time.perf_counter() - self._start, 4),
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'counts': self.counts,
+        }
+
+    def summary(self):
+        """One line per stage for the console"""
+        return '\n'.join(f"   {name:<12} {seconds:8.2f}s" for name, seconds in self.stages.items())
+
+
+def load_metrics(path=DEFAULT_METRICS):
+    """Metrics of the last run, or None when the pipeline has not written any"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
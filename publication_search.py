@@ -0,0 +1,83 @@
+"""Inverted index for the dashboard's publication search box.
+
+Built once per dataset (under st.cache_resource) over Title, the
+classification Reason, the names of the matched keywords and, when the output
+has them, Journal/Authors. Query terms match word prefixes, all terms must
+match (AND), and results come back ordered by relevance: field-weighted term
+frequency x inverse document frequency, with exact word hits counting double.
+"""
+import re
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+FIELD_WEIGHTS = {'Title': 3.0, 'Journal': 1.5, 'Authors': 1.5, 'Keywords': 1.0, 'Reason': 1.0}
+
+_MARKUP = re.compile(r'<[^>]+>')
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Lowercase word tokens with HTML markup removed (LiFePO<sub>4</sub> -> lifepo4)"""
+    return _TOKEN.findall(_MARKUP.sub('', str(text)).lower())
+
+
+class PublicationIndex:
+    """Term -> rows postings stored contiguously in sorted term order.
+
+    Because terms are sorted, every term sharing a prefix is one contiguous
+    slice of the postings, so a prefix lookup is two binary searches.
+    """
+
+    def __init__(self, fields, weights=FIELD_WEIGHTS):
+        self.labels = fields.index.to_numpy()
+        n_rows = len(fields)
+
+        terms, rows, field_weights = [], [], []
+        for column in fields.columns:
+            tokens = fields[column].astype(object).fillna('').astype(str).map(tokenize)
+            terms.append(list(chain.from_iterable(tokens)))
+            rows.append(np.repeat(np.arange(n_rows), tokens.map(len).to_numpy()))
+            field_weights.append(np.full(len(terms[-1]), weights.get(column, 1.0)))
+
+        postings = (pd.DataFrame({
+            'term': list(chain.from_iterable(terms)),
+            'row': np.concatenate(rows) if rows else np.array([], dtype=int),
+            'weight': np.concatenate(field_weights) if field_weights else np.array([]),
+        }).groupby(['term', 'row'], sort=True)['weight'].sum())
+
+        posting_terms = postings.index.get_level_values('term').to_numpy(dtype=object)
+        starts = np.flatnonzero(np.r_[True, posting_terms[1:] != posting_terms[:-1]]) if len(postings) else np.array([], dtype=int)
+        self.terms = posting_terms[starts]
+        self.offsets = np.append(starts, len(postings))
+        self.rows = postings.index.get_level_values('row').to_numpy(dtype=np.int32)
+
+        document_frequency = np.diff(self.offsets)
+        idf = np.log1p(n_rows / np.maximum(document_frequency, 1))
+        self.scores = (postings.to_numpy() * np.repeat(idf, document_frequency)).astype(np.float32)
+
+    def search(self, query):
+        """Row labels matching every query term, best first; None for an empty query"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return None
+
+        n_rows = len(self.labels)
+        total = None
+        for token in tokens:
+            lo = np.searchsorted(self.terms, token, side='left')
+            hi = np.searchsorted(self.terms, token + '\U0010ffff', side='left')
+            if lo == hi:
+                return self.labels[:0]
+            start, end = self.offsets[lo], self.offsets[hi]
+            scores = self.scores[start:end].copy()
+            # Exact word hits rank above prefix-only hits
+            if self.terms[lo] == token:
+                scores[:self.offsets[lo + 1] - start] *= 2
+            term_scores = np.bincount(self.rows[start:end], weights=scores, minlength=n_rows)
+            total = term_scores if total is None else np.where(term_scores > 0, total + term_scores, 0) * (total > 0)
+
+        matched = np.flatnonzero(total)
+        order = np.argsort(-total[matched], kind='stable')
+        return self.labels[matched[order]]
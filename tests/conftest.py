@@ -0,0 +1,31 @@
+import glob
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live flat in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def demo_texts():
+    """Cleaned title of every publication in docs/data, as the classifier sees it"""
+    from material_classifier import clean_text
+    titles = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'docs', 'data', '*', 'publications.json'))):
+        with open(path) as f:
+            titles.extend(pub.get('title') or '' for pub in json.load(f))
+    return pd.Series([clean_text(title) for title in titles])
+
+
+@pytest.fixture(scope='session')
+def demo_db(tmp_path_factory):
+    """SQLite stand-in database seeded from docs/data"""
+    from classify_publications import make_demo_database
+    path = str(tmp_path_factory.mktemp('demo') / 'demo.sqlite')
+    make_demo_database(path, os.path.join(ROOT, 'docs', 'data'))
+    return path
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import shutil
+
+import pytest
+
+from build_bundles import build_bundles, load_faculty, make_bundle
+
+from conftest import ROOT
+
+
+def unpack(bundle):
+    """Python mirror of unpackBundle() in docs/js/dashboard.js"""
+    dois, journals, authors = bundle['dois'], bundle['journals'], bundle['authors']
+    pubs = bundle['publications']
+    publications = [{'doi': dois[doi], 'title': pubs['title'][i], 'year': pubs['year'][i],
+                     'journal': journals[pubs['journal'][i]], 'authors': [authors[a] for a in pubs['authors'][i]],
+                     'citation_count': pubs['citation_count'][i]} for i, doi in enumerate(pubs['doi'])]
+    categories = bundle['categories']
+    if categories:
+        categories = dict(categories, categories=[dict(c, papers=[dois[p] for p in c['papers']])
+                                                  for c in categories['categories']])
+    return {'profile': bundle['profile'], 'publications': publications, 'categories': categories,
+            'coi_stats': bundle['coi_stats']}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(os.path.join(ROOT, 'docs', 'data'), path, ignore=shutil.ignore_patterns('bundles', 'manifest.json'))
+    return str(path)
+
+
+def faculty_dirs(data_dir):
+    with open(os.path.join(data_dir, 'faculty_list.json')) as f:
+        return [os.path.join(data_dir, f['unity_id']) for f in json.load(f)
+                if os.path.isdir(os.path.join(data_dir, f['unity_id']))]
+
+
+def test_bundles_unpack_to_the_source_files(data_dir):
+    for faculty_dir in faculty_dirs(data_dir):
+        source = load_faculty(faculty_dir)
+        unpacked = unpack(json.loads(json.dumps(make_bundle(source))))
+        assert unpacked == {name: source[name] or ([] if name == 'publications' else None)
+                            for name in unpacked}, faculty_dir
+
+
+def test_manifest_points_at_written_bundles(data_dir):
+    manifest, _ = build_bundles(data_dir)
+
+    assert set(manifest['bundles']) == {os.path.basename(d) for d in faculty_dirs(data_dir)}
+    for unity_id, path in manifest['bundles'].items():
+        with open(os.path.join(data_dir, path), 'rb') as f:
+            payload = f.read()
+        with open(os.path.join(data_dir, path + '.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()) == payload
+        assert unpack(json.loads(payload))['profile'] == load_faculty(os.path.join(data_dir, unity_id))['profile']
+
+
+def test_rebuild_renames_only_changed_bundles(data_dir):
+    before, _ = build_bundles(data_dir)
+    unity_id = os.path.basename(faculty_dirs(data_dir)[0])
+    publications_path = os.path.join(data_dir, unity_id, 'publications.json')
+    with open(publications_path) as f:
+        publications = json.load(f)
+    publications[0]['citation_count'] += 1
+    with open(publications_path, 'w') as f:
+        json.dump(publications, f)
+
+    after, _ = build_bundles(data_dir)
+
+    changed = {u for u in before['bundles'] if before['bundles'][u] != after['bundles'][u]}
+    assert changed == {unity_id}
+    bundles = set(os.listdir(os.path.join(data_dir, 'bundles')))
+    assert os.path.basename(before['bundles'][unity_id]) not in bundles
+    assert os.path.basename(after['bundles'][unity_id]) in bundles
+
+
+def test_unchanged_inputs_are_not_rebuilt(data_dir):
+    first, totals = build_bundles(data_dir)
+    assert totals['built'] == len(first['bundles'])
+
+    second, totals = build_bundles(data_dir)
+    assert (totals['built'], second) == (0, first)
+
+    _, totals = build_bundles(data_dir, force=True)
+    assert totals['built'] == len(first['bundles'])
+
+
+def test_only_faculty_with_changed_or_missing_inputs_are_rebuilt(data_dir):
+    before, _ = build_bundles(data_dir)
+    edited, trimmed, lost = [os.path.basename(d) for d in faculty_dirs(data_dir)[:3]]
+    with open(os.path.join(data_dir, edited, 'profile.json')) as f:
+        profile = json.load(f)
+    with open(os.path.join(data_dir, edited, 'profile.json'), 'w') as f:
+        json.dump(dict(profile, name=profile.get('name', '') + ' Jr.'), f)
+    for name in ('categories', 'coi_stats'):
+        path = os.path.join(data_dir, trimmed, f'{name}.json')
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(os.path.join(data_dir, before['bundles'][lost]))
+
+    after, totals = build_bundles(data_dir)
+
+    assert totals['built'] == 3
+    assert {u for u in before['bundles'] if before['bundles'][u] != after['bundles'][u]} == {edited, trimmed}
+    assert os.path.exists(os.path.join(data_dir, after['bundles'][lost]))
+    with open(os.path.join(data_dir, after['bundles'][trimmed])) as f:
+        bundle = json.load(f)
+    assert unpack(bundle) == unpack(make_bundle(load_faculty(os.path.join(data_dir, trimmed))))
+
+
+def test_parallel_build_equals_serial_build(data_dir, tmp_path):
+    serial, _ = build_bundles(data_dir)
+    parallel_dir = str(tmp_path / 'parallel')
+    shutil.copytree(data_dir, parallel_dir, ignore=shutil.ignore_patterns('bundles', 'manifest.json'))
+
+    parallel, totals = build_bundles(parallel_dir, workers=2)
+
+    assert parallel == serial
+    assert totals['built'] == len(serial['bundles'])
+    assert sorted(os.listdir(os.path.join(parallel_dir, 'bundles'))) == sorted(os.listdir(os.path.join(data_dir, 'bundles')))
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+from classification_cache import ClassificationCache, cached_classify_series, text_key
+from material_classifier import classify_series
+
+
+def stored(cache, method):
+    return cache.stats().get(method, {}).get('stored', 0)
+
+
+def test_lookup_ignores_case_and_whitespace(tmp_path):
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.put_many('rule_based', 'v1', ['Polymer  Blends'], [('polymer', 0.9, 'why')])
+        found = cache.get_many('rule_based', 'v1', ['polymer blends', 'steel'])
+
+        assert found == {0: ('polymer', 0.9, 'why')}
+        assert cache.stats()['rule_based'] == {'hits': 1, 'misses': 1, 'stored': 1}
+
+
+def test_new_version_misses_and_purges_only_its_method(tmp_path):
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.put_many('rule_based', 'v1', ['a', 'b'], [('metal', 1.0, ''), ('metal', 1.0, '')])
+        cache.put_many('generative', 'g1', ['a'], [('metal', 0.9, 'AI: alloy')])
+
+        assert cache.get_many('rule_based', 'v2', ['a', 'b']) == {}
+        assert stored(cache, 'rule_based') == 0
+        assert cache.get_many('generative', 'g1', ['a']) == {0: ('metal', 0.9, 'AI: alloy')}
+
+
+def test_entries_persist_across_opens(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with ClassificationCache(path) as cache:
+        cache.put_many('generative', 'g1', ['a'], [('ceramic', 0.8, 'AI: oxide')])
+    with ClassificationCache(path) as cache:
+        assert cache.get_many('generative', 'g1', ['a']) == {0: ('ceramic', 0.8, 'AI: oxide')}
+
+
+def test_evict_older_than(tmp_path):
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.put_many('rule_based', 'v1', ['old', 'new'], [('metal', 1.0, ''), ('metal', 1.0, '')])
+        cache.conn.execute("UPDATE results SET created_at = ? WHERE key = ?",
+                           (time.time() - 10 * 86400, text_key('old', 'v1')))
+
+        assert cache.evict_older_than(7) == 1
+        assert stored(cache, 'rule_based') == 1
+
+
+def refuse_to_classify(texts, threshold, details):
+    raise AssertionError(f"{len(texts)} cached texts were matched again")
+
+
+def test_cached_classify_series_keeps_scores_and_keyword_ids(tmp_path, demo_texts):
+    expected = classify_series(demo_texts, details=True)
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cold = cached_classify_series(cache, demo_texts)
+        warm = cached_classify_series(cache, demo_texts, classify=refuse_to_classify)
+
+    for result in (cold, warm):
+        pd.testing.assert_frame_equal(result.drop(columns='keyword_ids'), expected.drop(columns='keyword_ids'),
+                                      check_dtype=False)
+        assert result['keyword_ids'].tolist() == expected['keyword_ids'].tolist()
+
+
+def test_cache_without_details_is_upgraded(tmp_path, demo_texts):
+    path = str(tmp_path / 'cache.sqlite')
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE results (method TEXT NOT NULL, key TEXT NOT NULL, version TEXT NOT NULL,
+                    category TEXT NOT NULL, confidence REAL NOT NULL, explanation TEXT NOT NULL,
+                    created_at REAL NOT NULL, PRIMARY KEY (method, key))""")
+    conn.close()
+    with ClassificationCache(path) as cache:
+        cache.put_many('rule_based', 'v1', ['a'], [('metal', 1.0, '')])
+        assert cache.get_many('rule_based', 'v1', ['a'], details=True) == {}
+
+        cached_classify_series(cache, demo_texts)
+        cached_classify_series(cache, demo_texts, classify=refuse_to_classify)
+        assert cache.stats()['rule_based']['misses'] == len(demo_texts) + 1
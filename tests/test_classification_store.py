@@ -0,0 +1,154 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classification_store import (CSV_DTYPES, DATA_COLUMNS, EXPLANATION_COLUMNS, KEYWORD_IDS, arrow_path_for,
+                                  available_columns, export_bytes, load_classifications, load_explanations,
+                                  load_search_fields, load_shared, parquet_path_for, render_explanations,
+                                  write_parquet)
+from dashboard_data import DashboardData
+from publication_search import PublicationIndex
+
+
+@pytest.fixture
+def output(tmp_path):
+    """A small CSV output with its Parquet copy"""
+    df = pd.DataFrame({
+        'Faculty': ['Ada', 'Bo', 'Ada'],
+        'Title': ['Polymer blends', 'Steel fatigue', 'Oxide films'],
+        'Year': [2024, 2023, 2021],
+        'Category': ['polymer', 'metal', 'ceramic'],
+        'Method': ['Rule-Based', 'OpenAI', 'Rule-Based'],
+        'Confidence': np.array([1.0, 0.9, 0.75], dtype='float32'),
+        'Keyword IDs': ['0', None, '7 3'],
+        'Reason': [None, 'fatigue of steel', None],
+    })
+    csv_path = str(tmp_path / 'production_classifications.csv')
+    df.to_csv(csv_path, index=False)
+    write_parquet(df, parquet_path_for(csv_path))
+    return df, csv_path
+
+
+def test_parquet_copy_holds_the_same_rows_in_compact_dtypes(output):
+    df, csv_path = output
+    loaded = load_classifications(['Faculty', 'Year', 'Category'], csv_path)
+
+    assert list(loaded.columns) == ['Faculty', 'Year', 'Category']
+    assert loaded['Faculty'].dtype == 'category' and loaded['Year'].dtype == 'Int16'
+    pd.testing.assert_frame_equal(loaded.astype({'Faculty': object, 'Year': int, 'Category': object}),
+                                  df[['Faculty', 'Year', 'Category']], check_dtype=False)
+    explanations = load_explanations(csv_path)
+    assert list(explanations.columns) == EXPLANATION_COLUMNS
+    assert [ids.tolist() for ids in explanations[KEYWORD_IDS]] == [[0], [], [7, 3]]
+
+
+
+@pytest.mark.parametrize('parquet', [True, False], ids=['parquet', 'csv'])
+def test_search_fields_name_the_matched_keywords(output, tmp_path, parquet):
+    df, csv_path = output
+    if not parquet:
+        (tmp_path / 'production_classifications.parquet').unlink()
+    names = [f'keyword{i}' for i in range(10)]
+
+    fields = load_search_fields(csv_path, keyword_names=names)
+    assert list(fields.columns) == ['Title', 'Reason', 'Keywords']
+    assert fields['Keywords'].tolist() == ['keyword0', '', 'keyword7 keyword3']
+    assert PublicationIndex(fields).search('keyword3 oxide') == [2]
+    assert 'Keywords' not in load_search_fields(csv_path).columns
+
+
+def test_legacy_output_searches_its_explanations(output):
+    df, csv_path = output
+    df.drop(columns=EXPLANATION_COLUMNS).assign(Explanation=['Found 1 keywords: polymer', 'AI: steel', '']).to_csv(
+        csv_path, index=False)
+    os.remove(parquet_path_for(csv_path))
+
+    fields = load_search_fields(csv_path, keyword_names=[])
+    assert list(fields.columns) == ['Title', 'Explanation']
+    assert PublicationIndex(fields).search('keywords') == [0]
+
+@pytest.mark.parametrize('parquet', [True, False], ids=['parquet', 'csv'])
+def test_rendered_explanations_name_the_matched_keywords(output, tmp_path, parquet):
+    df, csv_path = output
+    if not parquet:
+        (tmp_path / 'production_classifications.parquet').unlink()
+    rows = load_classifications(['Method', 'Category'] + EXPLANATION_COLUMNS, csv_path)
+
+    names = [f'keyword {i}' for i in range(10)]
+    assert render_explanations(rows, names) == [
+        'Confidence: 100.0% | Found 1 keywords: keyword 0',
+        'AI: fatigue of steel',
+        'Confidence: 75.0% | Found 2 keywords: keyword 7, keyword 3',
+    ]
+
+
+@pytest.mark.parametrize('load', [load_classifications, load_shared])
+def test_csv_rewritten_after_the_parquet_copy_wins(output, load):
+    df, csv_path = output
+    load_shared(['Title'], csv_path)  # leaves an Arrow copy of the old rows behind too
+    # What the notebook does: rewrite only the CSV, here in the format before the structured columns
+    legacy = df.drop(columns=EXPLANATION_COLUMNS).assign(Explanation='Found 1 keywords: steel').iloc[::-1]
+    legacy.to_csv(csv_path, index=False)
+    parquet_path = parquet_path_for(csv_path)
+    os.utime(parquet_path, (os.path.getmtime(csv_path) - 10,) * 2)
+
+    assert load(['Title', 'Year'], csv_path)['Title'].tolist() == legacy['Title'].tolist()
+    assert 'Explanation' in available_columns(csv_path)
+
+    write_parquet(legacy, parquet_path)
+    assert load(['Title'], csv_path)['Title'].tolist() == legacy['Title'].tolist()
+
+
+@pytest.mark.parametrize('load', [load_classifications, load_shared])
+def test_undated_rows_load_with_a_missing_year(output, tmp_path, load):
+    df, csv_path = output
+    undated = df.astype({'Year': 'Int16'})
+    undated.loc[1, 'Year'] = pd.NA
+    write_parquet(undated, parquet_path_for(csv_path))
+
+    for path in (csv_path, str(tmp_path / 'csv_only.csv')):
+        undated.to_csv(path, index=False)
+        loaded = load(['Title', 'Year'], path)
+        assert loaded['Year'].dtype == 'Int16'
+        assert loaded['Year'].isna().tolist() == [False, True, False]
+    assert DashboardData(load(DATA_COLUMNS, csv_path)).years == [2021, 2024]
+
+
+def test_csv_is_read_when_there_is_no_parquet_copy(output, tmp_path):
+    df, csv_path = output
+    (tmp_path / 'production_classifications.parquet').unlink()
+
+    loaded = load_classifications(['Title', 'Year', 'Method'], csv_path)
+    assert loaded['Method'].dtype == 'category' and loaded['Year'].dtype == 'Int16'
+    assert loaded['Title'].tolist() == df['Title'].tolist()
+
+
+@pytest.mark.parametrize('fmt, read', [('CSV', lambda f: pd.read_csv(f, dtype=CSV_DTYPES)), ('Parquet', pd.read_parquet)])
+def test_export_bytes_joins_chunks_into_one_file(output, fmt, read):
+    df, _ = output
+    data = export_bytes([df.iloc[:2], df.iloc[2:]], fmt)
+    pd.testing.assert_frame_equal(read(io.BytesIO(data)), df)
+
+
+def test_shared_frame_equals_the_parquet_frame(output):
+    df, csv_path = output
+    columns = ['Faculty', 'Title', 'Year', 'Category']
+    shared = load_shared(columns, csv_path)
+
+    assert os.path.exists(arrow_path_for(parquet_path_for(csv_path)))
+    pd.testing.assert_frame_equal(shared.astype({'Title': object}),
+                                  load_classifications(columns, csv_path).astype({'Title': object}))
+
+
+def test_shared_copy_follows_a_rewritten_parquet_file(output):
+    df, csv_path = output
+    load_shared(['Title'], csv_path)
+    parquet_path = parquet_path_for(csv_path)
+    write_parquet(df.iloc[::-1], parquet_path)
+    arrow_path = arrow_path_for(parquet_path)
+    os.utime(arrow_path, (os.path.getmtime(parquet_path) - 10,) * 2)
+
+    assert load_shared(['Title'], csv_path)['Title'].tolist() == df['Title'].tolist()[::-1]
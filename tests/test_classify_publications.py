@@ -0,0 +1,345 @@
+import json
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import classify_publications
+import material_classifier
+from classification_cache import ClassificationCache
+from classification_store import (CSV_DTYPES, EXPLANATION_COLUMNS, KEYWORD_IDS, parquet_is_current,
+                                  publication_keys, render_explanations)
+from classify_publications import classify_hybrid
+from local_classifier import LocalClassifier
+from material_classifier import MATERIAL_KEYWORDS, KeywordMatcher, classify_series, keyword_entries, prepare_texts
+
+
+def classify(monkeypatch, demo_db, tmp_path, name, *options):
+    """Run the classify_publications CLI rule-based into tmp_path/<name>.csv and read the result"""
+    output = tmp_path / f'{name}.csv'
+    monkeypatch.setattr(sys, 'argv', [
+        'classify_publications.py', '--sqlite', demo_db, '--rule-based-only',
+        '--output', str(output), '--state', str(tmp_path / f'{name}.json'),
+        '--cache', str(tmp_path / 'cache.sqlite'), '--metrics', str(tmp_path / 'metrics.json'), *options])
+    classify_publications.main()
+    return pd.read_csv(output)
+
+
+def add_publications(db, count):
+    """Copy the first `count` publications under new ids, so an incremental run has work to do"""
+    conn = sqlite3.connect(db)
+    try:
+        top = conn.execute("SELECT MAX(publication_id) FROM publications").fetchone()[0]
+        conn.execute(f"""
+            INSERT INTO publications
+            SELECT publication_id + {top}, title, publication_year, keywords, faculty_unity_id, doi,
+                   journal_name, updated_at
+            FROM publications ORDER BY publication_id LIMIT {int(count)}""")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def edit_keywords(monkeypatch):
+    """Insert a phrase ahead of the others and remove one"""
+    monkeypatch.setitem(MATERIAL_KEYWORDS, 'polymer', ['photodetector'] + MATERIAL_KEYWORDS['polymer'])
+    monkeypatch.setitem(MATERIAL_KEYWORDS, 'metal', [k for k in MATERIAL_KEYWORDS['metal'] if k != 'alloy'])
+    monkeypatch.setattr(material_classifier, '_default_matcher', KeywordMatcher())
+
+
+def test_incremental_run_equals_full_run(monkeypatch, capsys, demo_db, tmp_path):
+    db = str(shutil.copy(demo_db, tmp_path / 'demo.sqlite'))
+    before = classify(monkeypatch, db, tmp_path, 'incremental')
+    add_publications(db, 150)
+    capsys.readouterr()
+
+    incremental = classify(monkeypatch, db, tmp_path, 'incremental')
+    full = classify(monkeypatch, db, tmp_path, 'full', '--full')
+
+    assert f"({len(full)} records, {len(full) - len(before)} updated)" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_up_to_date_output_is_left_alone(monkeypatch, capsys, demo_db, tmp_path):
+    before = classify(monkeypatch, demo_db, tmp_path, 'incremental')
+    capsys.readouterr()
+    after = classify(monkeypatch, demo_db, tmp_path, 'incremental')
+
+    assert "Nothing to classify" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(after, before)
+
+
+def test_run_writes_stage_timings(monkeypatch, demo_db, tmp_path):
+    output = classify(monkeypatch, demo_db, tmp_path, 'full', '--full')
+    with open(tmp_path / 'metrics.json') as f:
+        metrics = json.load(f)
+
+    assert {'load', 'prepare', 'rule_based', 'export'} <= set(metrics['stages'])
+    assert metrics['counts']['records'] == metrics['counts']['rule_based'] == len(output)
+
+
+def parquet_values(path):
+    """Parquet output as plain values: chunks carry their own category order, and an
+    all-null column may be stored as an empty dictionary or as plain nulls"""
+    df = pd.read_parquet(path).astype(object)
+    return df.where(df.notna(), None)
+
+
+@pytest.mark.parametrize('chunksize', ['97', '5000'])
+def test_streamed_run_equals_run_in_one_go(monkeypatch, demo_db, tmp_path, chunksize):
+    streamed = classify(monkeypatch, demo_db, tmp_path, 'streamed', '--full', '--chunksize', chunksize)
+    in_one_go = classify(monkeypatch, demo_db, tmp_path, 'full', '--full')
+
+    pd.testing.assert_frame_equal(streamed, in_one_go)
+    pd.testing.assert_frame_equal(parquet_values(tmp_path / 'streamed.parquet'),
+                                  parquet_values(tmp_path / 'full.parquet'))
+    for name in ('streamed', 'full'):
+        assert parquet_is_current(str(tmp_path / f'{name}.csv'), str(tmp_path / f'{name}.parquet'))
+
+
+@pytest.mark.parametrize('chunksize', ['97', '5000'])
+def test_streamed_incremental_run_is_in_output_order(monkeypatch, demo_db, tmp_path, chunksize):
+    db = str(shutil.copy(demo_db, tmp_path / 'demo.sqlite'))
+    classify(monkeypatch, db, tmp_path, 'incremental', '--chunksize', chunksize)
+    add_publications(db, 150)
+
+    incremental = classify(monkeypatch, db, tmp_path, 'incremental', '--chunksize', chunksize)
+    full = classify(monkeypatch, db, tmp_path, 'full', '--full')
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_merge_output_chunks_equals_merge_output():
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({'publication_id': rng.permutation(400) + 1, 'Year': rng.integers(2019, 2026, 400)})
+    rows['Title'] = 'paper ' + rows['publication_id'].astype(str)
+    existing, new = rows.iloc[:300], rows.iloc[250:]  # 50 reclassified, 100 new
+    expected = classify_publications.merge_output(existing, new)
+
+    def chunked(frame, size):
+        frame = frame.sort_values(['Year', 'publication_id'], ascending=[False, True])
+        return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+    kept = existing[~existing['publication_id'].isin(new['publication_id'])]
+    merged = pd.concat(classify_publications.merge_output_chunks(chunked(new, 17), chunked(kept, 40)),
+                       ignore_index=True)
+    pd.testing.assert_frame_equal(merged, expected)
+
+
+def test_replica_classifies_like_its_source(monkeypatch, demo_db, tmp_path):
+    replica = str(tmp_path / 'replica.sqlite')
+    monkeypatch.setattr(sys, 'argv', ['classify_publications.py', '--sqlite', demo_db, '--replicate-to', replica,
+                                      '--chunksize', '100'])
+    classify_publications.main()
+
+    from_replica = classify(monkeypatch, replica, tmp_path, 'replica', '--all-years', '--chunksize', '97')
+    from_source = classify(monkeypatch, demo_db, tmp_path, 'source', '--all-years')
+    pd.testing.assert_frame_equal(from_replica, from_source)
+
+
+def test_publications_without_a_year_are_skipped(monkeypatch, demo_db, tmp_path):
+    db = str(shutil.copy(demo_db, tmp_path / 'demo.sqlite'))
+    conn = sqlite3.connect(db)
+    try:
+        conn.execute("""
+            INSERT INTO publications
+            SELECT MAX(publication_id) + 1, 'Undated polymer films', NULL, 'polymer', faculty_unity_id,
+                   '10.1000/undated', 'Journal of Undated Work', NULL
+            FROM publications""")
+        conn.commit()
+    finally:
+        conn.close()
+
+    streamed = classify(monkeypatch, db, tmp_path, 'streamed', '--all-years', '--chunksize', '97')
+    in_one_go = classify(monkeypatch, db, tmp_path, 'full', '--all-years')
+
+    assert 'Undated polymer films' not in set(in_one_go['Title'])
+    assert in_one_go['Year'].notna().all()
+    pd.testing.assert_frame_equal(streamed, in_one_go)
+
+
+def test_prefetch_yields_every_chunk_in_order_and_reraises():
+    assert list(classify_publications.prefetch((i for i in range(50)), max_pending=2)) == list(range(50))
+
+    def failing():
+        yield 1
+        raise ValueError("read failed")
+
+    chunks = classify_publications.prefetch(failing(), max_pending=2)
+    assert next(chunks) == 1
+    with pytest.raises(ValueError, match="read failed"):
+        next(chunks)
+
+
+def test_prefetch_stops_the_producer_when_the_consumer_fails():
+    produced = []
+    closed = threading.Event()
+
+    def chunks():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    threads = threading.active_count()
+    pending = classify_publications.prefetch(chunks(), max_pending=1)
+    with pytest.raises(RuntimeError):
+        for _ in pending:
+            raise RuntimeError("consumer failed")
+    pending.close()
+
+    assert closed.is_set()
+    assert len(produced) < 1000
+    assert threading.active_count() == threads
+
+
+def test_stored_scores_replay_to_the_written_labels(monkeypatch, demo_db, tmp_path):
+    from threshold_simulator import load_scores, rule_based_labels
+    output = classify(monkeypatch, demo_db, tmp_path, 'full', '--full')
+
+    scores, categories, _ = load_scores(str(tmp_path / 'full.csv'))
+    _, labels = rule_based_labels(scores, categories)
+    papers = output[~pd.Series(publication_keys(output['DOI'], output['Title'])).duplicated()]
+    assert labels.tolist() == papers['Category'].tolist()
+
+
+class RecordingEngine:
+    """Generative stand-in that labels everything 'polymer' and records what it was asked"""
+    version = 'recording'
+
+    def __init__(self):
+        self.texts = []
+
+    async def classify_many(self, texts):
+        self.texts.extend(texts)
+        return [('polymer', 0.9, 'recorded')] * len(texts)
+
+
+def test_rows_of_one_paper_are_classified_once(tmp_path, demo_texts):
+    texts = list(demo_texts[:40])
+    # Papers 0-19 are each listed three times with the DOI written three ways, and later rows carry
+    # other keywords; papers 20-39 have no DOI and are listed twice under differently marked-up titles
+    rows = [(doi.format(i), f'Paper {i}', texts[i] if n == 0 else texts[i] + ' ceramic glass')
+            for i in range(20) for n, doi in enumerate(['10.1/P{}', 'https://doi.org/10.1/p{}', 'doi:10.1/P{}'])]
+    rows += [(None, f'Untitled <i>{i}</i>', texts[i]) for i in range(20, 40)]
+    rows += [(None, f'untitled {i}.', 'metal alloy') for i in range(20, 40)]
+    df = pd.DataFrame(rows, columns=['doi', 'title', 'text_for_classification'])
+    papers = [i // 3 for i in range(60)] + list(range(20, 40)) * 2
+
+    engine = RecordingEngine()
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        result = classify_hybrid(df.copy(), cache, engine, threshold=0.7)
+
+    first_rows = pd.Series(range(len(df))).groupby(papers).transform('min').to_numpy()
+    expected = classify_series(df['text_for_classification'].iloc[first_rows].reset_index(drop=True))
+    api = (expected['confidence'] < 0.7).to_numpy()
+    assert api.any() and not api.all()
+    assert result['category'].tolist() == expected['category'].where(~api, 'polymer').tolist()
+    assert result['method'].tolist() == np.where(api, 'generative', 'rule_based').tolist()
+    assert sorted(engine.texts) == sorted(df['text_for_classification'].iloc[sorted(set(first_rows[api]))])
+    assert set(result['doi'].dropna()) == {f'10.1/p{i}' for i in range(20)}
+
+
+
+def test_classification_time_includes_the_local_tier(monkeypatch, capsys, demo_db, demo_texts, tmp_path):
+    model_path = str(tmp_path / 'local.npz')
+    LocalClassifier.train(demo_texts, classify_series(demo_texts)['category']).save(model_path)
+    classify_locally = LocalClassifier.classify
+
+    def slow_classify(self, texts):
+        time.sleep(0.5)
+        return classify_locally(self, texts)
+
+    monkeypatch.setattr(LocalClassifier, 'classify', slow_classify)
+    capsys.readouterr()
+
+    classify(monkeypatch, demo_db, tmp_path, 'full', '--full', '--local-model', model_path, '--local-threshold', '0')
+
+    with open(tmp_path / 'metrics.json') as f:
+        stages = json.load(f)['stages']
+    seconds = float(re.search(r'unique papers\) in ([\d.]+) seconds', capsys.readouterr().out).group(1))
+    assert stages['local'] >= 0.5
+    assert seconds == round(stages['rule_based'] + stages['local'], 1)
+
+def test_local_model_answers_before_the_api(tmp_path, demo_texts):
+    texts = demo_texts.drop_duplicates().reset_index(drop=True)
+    df = pd.DataFrame({'doi': None, 'title': [f'Paper {i}' for i in range(len(texts))], 'text_for_classification': texts})
+    local = LocalClassifier.train(texts, classify_series(texts)['category'])
+    rule_based = classify_series(texts)
+    local_results = local.classify(texts)
+    api_bound = rule_based['confidence'] < 0.7
+    local_threshold = local_results.loc[api_bound, 'confidence'].median()
+
+    engine = RecordingEngine()
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        result = classify_hybrid(df.copy(), cache, engine, threshold=0.7, local=local, local_threshold=local_threshold)
+
+    answered_locally = api_bound & (local_results['confidence'] >= local_threshold)
+    to_api = api_bound & ~answered_locally
+    assert answered_locally.any() and to_api.any()
+    assert result['method'].tolist() == np.select([answered_locally, to_api], ['local', 'generative'],
+                                                  'rule_based').tolist()
+    assert result['category'].tolist() == np.select([answered_locally, to_api],
+                                                    [local_results['category'], 'polymer'],
+                                                    rule_based['category']).tolist()
+    assert engine.texts == texts[to_api].tolist()
+
+
+@pytest.mark.parametrize('options', [[], ['--chunksize', '97']], ids=['in-one-go', 'streamed'])
+def test_differential_run_after_keyword_edit_equals_full_run(monkeypatch, capsys, demo_db, tmp_path, options):
+    before = classify(monkeypatch, demo_db, tmp_path, 'incremental', *options)
+    edit_keywords(monkeypatch)
+    capsys.readouterr()
+
+    differential = classify(monkeypatch, demo_db, tmp_path, 'incremental', *options)
+    reclassified = int(re.search(r'(\d+) publications contain changed keywords', capsys.readouterr().out).group(1))
+    full = classify(monkeypatch, demo_db, tmp_path, 'full', '--full', *options)
+
+    assert 0 < reclassified < len(before)
+    assert not differential.equals(before)
+    pd.testing.assert_frame_equal(differential, full)
+
+
+def test_structured_columns_render_the_rule_based_explanations(monkeypatch, demo_db, tmp_path):
+    classify(monkeypatch, demo_db, tmp_path, 'full', '--full')
+    output = pd.read_csv(tmp_path / 'full.csv', dtype=CSV_DTYPES)
+    conn = sqlite3.connect(demo_db)
+    try:
+        df = pd.read_sql("SELECT publication_id, title, COALESCE(keywords, '') AS keywords FROM publications", conn)
+    finally:
+        conn.close()
+    texts = prepare_texts(df.set_index('publication_id').loc[output['publication_id']].reset_index())
+
+    rendered = render_explanations(output, [keyword for _, keyword in keyword_entries()])
+    assert rendered == classify_series(texts)['explanation'].tolist()
+
+
+def to_legacy_output(path):
+    """Rewrite an output the way it was stored before Confidence, Keyword IDs and Reason columns"""
+    current = pd.read_csv(path, dtype=CSV_DTYPES)
+    explanations = render_explanations(current, [keyword for _, keyword in keyword_entries()])
+    legacy = current.drop(columns=EXPLANATION_COLUMNS)
+    legacy.insert(legacy.columns.get_loc('Method') + 1, 'Explanation', explanations)
+    legacy.to_csv(path, index=False)
+
+
+@pytest.mark.parametrize('options', [[], ['--chunksize', '97']], ids=['in-one-go', 'streamed'])
+def test_incremental_run_over_legacy_output_keeps_explanations(monkeypatch, demo_db, tmp_path, options):
+    db = shutil.copy(demo_db, tmp_path / 'demo.sqlite')
+    classify(monkeypatch, str(db), tmp_path, 'incremental', *options)
+    to_legacy_output(tmp_path / 'incremental.csv')
+    add_publications(db, 150)
+
+    incremental = classify(monkeypatch, str(db), tmp_path, 'incremental', *options)
+    full = classify(monkeypatch, str(db), tmp_path, 'full', '--full', *options)
+
+    assert incremental['Confidence'].notna().all()
+    assert incremental[KEYWORD_IDS].notna().sum() == full[KEYWORD_IDS].notna().sum() > 0
+    pd.testing.assert_frame_equal(incremental, full)
@@ -0,0 +1,96 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from collaboration_graph import INTERNAL_TYPES, CollaborationGraph
+
+
+def authorships(rows):
+    return pd.DataFrame(rows, columns=['work_id', 'year', 'openalex_id', 'name', 'institution', 'node_type'])
+
+
+def random_authorships(seed=3, n_authors=40, n_works=120):
+    rng = np.random.default_rng(seed)
+    types = rng.choice(['faculty', 'ncsu_nonfaculty', 'external'], n_authors, p=[0.4, 0.2, 0.4])
+    rows = []
+    for work in range(n_works):
+        year = int(rng.integers(2015, 2026))
+        for author in rng.choice(n_authors, int(rng.integers(1, 5)), replace=False):
+            rows.append((f'w{work}', year, f'A{author}', f'Author {author}',
+                         'NCSU' if types[author] != 'external' else f'U{author % 5}', types[author]))
+    return authorships(rows)
+
+
+def brute_force_pairs(frame):
+    """(a, b) -> list of the years of every work a and b share"""
+    pairs = {}
+    for _, work in frame.groupby('work_id'):
+        for a, b in combinations(sorted(set(work['openalex_id'])), 2):
+            pairs.setdefault((a, b), []).append(int(work['year'].iloc[0]))
+            pairs.setdefault((b, a), []).append(int(work['year'].iloc[0]))
+    return pairs
+
+
+def test_coauthored_pairs_and_weights():
+    graph = CollaborationGraph(authorships([
+        ('w1', 2021, 'A1', 'Ada', 'NCSU', 'faculty'),
+        ('w1', 2021, 'A2', 'Bo', 'NCSU', 'faculty'),
+        ('w2', 2023, 'A1', 'Ada', 'NCSU', 'faculty'),
+        ('w2', 2023, 'A2', 'Bo', 'NCSU', 'faculty'),
+        ('w2', 2023, 'A3', 'Cy', 'MIT', 'external'),
+    ]))
+    pairs = graph.coauthored()
+    assert pairs[['name_a', 'name_b', 'shared_works', 'years']].values.tolist() == [['Ada', 'Bo', 2, '2023,2021']]
+    assert graph.coauthored(since=2022)['shared_works'].tolist() == [2]
+
+
+def test_graph_equals_brute_force_pairs():
+    frame = random_authorships()
+    graph = CollaborationGraph(frame)
+    pairs = brute_force_pairs(frame)
+    node_type = frame.drop_duplicates('openalex_id').set_index('openalex_id')['node_type']
+
+    faculty = sorted(graph.node_index(node_type.index[node_type.eq('faculty')]))
+    for since, until in [(None, None), (2020, None), (2017, 2019)]:
+        expected = {}
+        for (a, b), years in pairs.items():
+            window = [y for y in years if (since is None or y >= since) and (until is None or y <= until)]
+            if window and node_type[a] == node_type[b] == 'faculty' and graph.node_index([a])[0] < graph.node_index([b])[0]:
+                expected[a, b] = (len(years), ','.join(map(str, sorted(set(years), reverse=True))))
+        found = graph.coauthored(since, until, among=faculty)
+        assert {(r.openalex_id_a, r.openalex_id_b): (r.shared_works, r.years) for r in found.itertuples()} == expected
+
+    ids = list(graph.author_ids)
+    overview = graph.overview(np.arange(len(ids)), recent_years=2, current_year=2025)
+    for node, author in enumerate(ids):
+        neighbours = {b for a, b in pairs if a == author}
+        ego = neighbours | {author}
+        edges = sum((a, b) in pairs for a, b in combinations(sorted(ego), 2))
+        possible = len(ego) * (len(ego) - 1) / 2
+        internal = sum(node_type[b] in INTERNAL_TYPES for b in neighbours)
+        recent = sum(any(y >= 2024 for y in pairs[author, b]) for b in neighbours)
+        row = overview.iloc[node]
+        assert (row['total_collaborators'], row['internal_count'], row['external_count'],
+                row['recent_collaborations_2years']) == (len(neighbours), internal, len(neighbours) - internal, recent)
+        assert row['network_density'] == round(edges / possible if possible else 0.0, 3)
+
+        stats = graph.coi_stats(node, overview.iloc[node].to_dict())
+        counts = {c['openalex_id']: c['collaboration_count'] for c in stats['top_collaborators']}
+        assert counts == {b: len(pairs[author, b]) for b in counts}
+        assert len(counts) == min(len(neighbours), 20)
+        works = frame[frame['openalex_id'] == author].drop_duplicates('work_id')
+        assert {t['year']: t['papers'] for t in stats['timeline']} == works['year'].value_counts().to_dict()
+
+
+def test_coauthored_without_matching_pairs_is_empty():
+    graph = CollaborationGraph(authorships([
+        ('w1', 2021, 'A1', 'Ada', 'NCSU', 'faculty'),
+        ('w1', 2021, 'A2', 'Bo', 'NCSU', 'faculty'),
+        ('w2', 2022, 'A3', 'Cy', 'NCSU', 'faculty'),
+        ('w2', 2022, 'A4', 'Di', 'MIT', 'external'),
+    ]))
+    later = graph.coauthored(since=2030)
+    assert later.empty
+    assert list(later.columns) == ['openalex_id_a', 'name_a', 'openalex_id_b', 'name_b', 'shared_works', 'years']
+    assert graph.coauthored(among=[2]).empty  # Cy only co-authored with an external author
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_data import (SORT_COLUMNS, DashboardData, chunked, counts_by, faculty_summary, filter_mask, filter_rows,
+                            page_count, page_slice, slice_cube, sorted_positions, unique_cube)
+
+DOI_FORMS = ['10.1000/P{}', 'https://doi.org/10.1000/p{}', 'doi: 10.1000/P{}']
+TITLE_FORMS = ['Paper {}', 'paper <i>{}</i>', 'PAPER {}.']
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(7)
+    n = 600
+    # Repeated papers are co-authored; even papers have a DOI, odd ones only a title, both written several ways
+    papers = rng.integers(0, 400, n)
+    forms = rng.integers(0, 3, n)
+    df = pd.DataFrame({
+        'Faculty': rng.choice(['Ada', 'Bo', 'Cy', 'Di'], n),
+        'Title': [TITLE_FORMS[f].format(p) for p, f in zip(papers, forms)],
+        'DOI': [DOI_FORMS[f].format(p) if p % 2 == 0 else None for p, f in zip(papers, forms)],
+        'Paper': papers,
+        'Year': rng.integers(2019, 2026, n),
+        'Category': rng.choice(['polymer', 'metal', 'ceramic', 'others'], n),
+        'Method': rng.choice(['Rule-Based', 'OpenAI'], n),
+    })
+    return DashboardData(df.astype({'Faculty': 'category', 'Category': 'category'}))
+
+
+FILTERS = [
+    (None, None, None),
+    ([2021, 2022], None, None),
+    (None, ['metal', 'others'], ['Bo']),
+    ([2025], ['polymer'], ['Ada', 'Di']),
+    ([2030], None, None),
+]
+
+
+@pytest.mark.parametrize('years, categories, faculties', FILTERS)
+@pytest.mark.parametrize('by', ['Category', 'Year', 'Faculty'])
+def test_cube_counts_equal_filtered_rows(data, years, categories, faculties, by):
+    rows = filter_rows(data.df, years or data.years, categories or data.categories, faculties or data.faculties)
+    expected = rows[by].value_counts()
+    counts = counts_by(slice_cube(data.cube, years, categories, faculties), by)
+    assert counts.to_dict() == expected[expected > 0].to_dict()
+    assert counts.is_monotonic_decreasing
+
+
+@pytest.mark.parametrize('years, categories, faculties', FILTERS)
+@pytest.mark.parametrize('by', ['Category', 'Year'])
+def test_unique_cube_counts_each_linked_paper_once(data, years, categories, faculties, by):
+    df = data.df
+    # A paper counts, under its first row's Year and Category, if any selected faculty is linked to it
+    linked = df.loc[df['Faculty'].isin(faculties or data.faculties), 'Paper']
+    papers = df.drop_duplicates('Paper')
+    papers = papers[papers['Paper'].isin(linked)]
+    expected = filter_rows(papers, years or data.years, categories or data.categories, data.faculties)[by].value_counts()
+
+    counts = counts_by(unique_cube(data, years, categories, faculties), by)
+    assert counts[counts > 0].to_dict() == expected[expected > 0].to_dict()
+
+
+def test_every_paper_is_one_publication(data):
+    assert len(data.publications) == data.df['Paper'].nunique()
+    assert data.cube_unique['Count'].sum() == data.df['Paper'].nunique()
+    assert data.cube['Count'].sum() == len(data.df)
+
+
+def test_faculty_summary(data):
+    summary = faculty_summary(data.cube).set_index('Faculty')
+    df = data.df.astype({'Faculty': str, 'Category': str})
+    assert summary['Total Publications'].to_dict() == df['Faculty'].value_counts().to_dict()
+    for faculty, categories in df.groupby('Faculty')['Category']:
+        counts = categories.value_counts()
+        assert counts[summary.loc[faculty, 'Primary Category']] == counts.max()
+
+
+@pytest.mark.parametrize('years, categories, faculties', FILTERS)
+@pytest.mark.parametrize('column', SORT_COLUMNS)
+@pytest.mark.parametrize('direction', ['Ascending', 'Descending'])
+def test_pages_equal_a_sorted_filtered_frame(data, years, categories, faculties, column, direction):
+    df = data.df.reset_index(drop=True)
+    years, categories, faculties = years or data.years, categories or data.categories, faculties or data.faculties
+    expected = filter_rows(df, years, categories, faculties).sort_values(
+        column, ascending=direction == 'Ascending', kind='stable').index.to_numpy()
+
+    positions = sorted_positions(data.sort_orders[column][direction], filter_mask(df, years, categories, faculties))
+    pages = [page_slice(positions, page, 25) for page in range(1, page_count(len(positions), 25) + 1)]
+    assert all(len(page) == 25 for page in pages[:-1])
+    np.testing.assert_array_equal(np.concatenate(pages), expected)
+    np.testing.assert_array_equal(np.concatenate(chunked(positions, 40)), expected)
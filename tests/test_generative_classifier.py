@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from chat_stub_server import start_stub_server
+from classification_cache import ClassificationCache, cached_classify_many
+from generative_classifier import GenerativeClassifier, RateLimiter
+
+TEXTS = [f'polymer blend number {i} for flexible electronics' for i in range(30)]
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = start_stub_server(**options)
+        servers.append(server)
+        return server, f'http://127.0.0.1:{server.server_port}/v1'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def classify(base_url, texts=TEXTS, **options):
+    engine = GenerativeClassifier(api_key='test', base_url=base_url, backoff=0.001, **options)
+    return engine, asyncio.run(engine.classify_many(texts))
+
+
+def test_retries_are_counted_apart_from_api_calls(stub):
+    server, base_url = stub(fail_every=3)
+    engine, results = classify(base_url, concurrency=4)
+
+    assert [category for category, _, _ in results] == ['polymer'] * len(TEXTS)
+    assert engine.stats['api_calls'] == len(TEXTS)
+    assert engine.stats['retries'] == server.stats['failures'] > 0
+    assert engine.stats['api_calls'] + engine.stats['retries'] == server.stats['requests']
+    assert engine.stats['errors'] == 0
+
+
+def test_exhausted_retries_become_api_errors(stub):
+    server, base_url = stub(fail_every=1)
+    engine, results = classify(base_url, TEXTS[:4], max_retries=2)
+
+    assert all(explanation.startswith('API Error') for _, _, explanation in results)
+    assert engine.stats['errors'] == 4
+    assert server.stats['requests'] == 4 * 3
+
+
+def test_client_errors_are_not_retried(stub):
+    server, base_url = stub(fail_every=1, fail_status=400)
+    engine, results = classify(base_url, TEXTS[:4])
+
+    assert all(explanation.startswith('API Error') for _, _, explanation in results)
+    assert engine.stats['retries'] == 0
+    assert server.stats['requests'] == 4
+
+
+def test_concurrency_is_bounded(stub):
+    server, base_url = stub(latency=0.02)
+    classify(base_url, concurrency=3)
+    assert server.stats['max_in_flight'] <= 3
+
+
+def acquire_all(limiter, tokens):
+    async def run():
+        start = time.monotonic()
+        for count in tokens:
+            await limiter.acquire(count)
+        return time.monotonic() - start
+    return asyncio.run(run())
+
+
+def test_repeated_misses_are_sent_once(stub, tmp_path):
+    server, base_url = stub()
+    engine = GenerativeClassifier(api_key='test', base_url=base_url)
+    # Each text three times, the repeats differing only in case and spacing; TEXTS[0] is already cached
+    texts = [variant for text in TEXTS[:10] for variant in (text, text.upper(), '  ' + text.replace(' ', '  '))]
+    with ClassificationCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.put_many('generative', engine.version, [TEXTS[0]], [('metal', 0.5, 'cached')])
+        results = asyncio.run(cached_classify_many(cache, engine, texts))
+        stored = cache.stats()['generative']['stored']
+
+    assert server.stats['requests'] == engine.stats['api_calls'] == 9
+    assert stored == 10
+    assert results[:3] == [('metal', 0.5, 'cached')] * 3
+    for start in range(3, len(texts), 3):
+        assert results[start][0] == 'polymer'
+        assert results[start:start + 3] == [results[start]] * 3
+
+
+def test_rate_limiter_spreads_requests_over_the_window():
+    assert acquire_all(RateLimiter(requests_per_minute=2, window=0.2), [0] * 5) >= 0.4
+    assert acquire_all(RateLimiter(requests_per_minute=5, window=0.2), [0] * 5) < 0.1
+
+
+def test_rate_limiter_spreads_tokens_over_the_window():
+    assert acquire_all(RateLimiter(tokens_per_minute=100, window=0.2), [60] * 3) >= 0.4
+    # A request larger than the whole budget still goes through on its own
+    assert acquire_all(RateLimiter(tokens_per_minute=100, window=0.2), [500]) < 0.1
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from local_classifier import LocalClassifier
+from material_classifier import classify_series
+
+
+@pytest.fixture(scope='module')
+def labelled(demo_texts):
+    texts = demo_texts.reset_index(drop=True)
+    return texts, classify_series(texts)['category']
+
+
+@pytest.fixture(scope='module')
+def model(labelled):
+    return LocalClassifier.train(*labelled)
+
+
+def test_model_learns_its_training_labels(model, labelled):
+    texts, labels = labelled
+    result = model.classify(texts)
+
+    assert result.index.equals(texts.index)
+    agrees = result['category'] == labels
+    # Better than always answering the most common label, and calibrated: confident answers agree more often
+    assert agrees.mean() > labels.value_counts(normalize=True).max() + 0.1
+    assert agrees[result['confidence'] >= 0.9].mean() > agrees.mean()
+    assert result['confidence'].between(1 / len(model.classes), 1).all()
+    np.testing.assert_allclose(model.predict_proba(texts).sum(axis=1), 1)
+
+
+def test_saved_model_predicts_the_same(model, labelled, tmp_path):
+    texts, _ = labelled
+    model.save(str(tmp_path / 'model.npz'))
+    loaded = LocalClassifier.load(str(tmp_path / 'model.npz'))
+
+    assert loaded.version == model.version
+    pd.testing.assert_frame_equal(loaded.classify(texts), model.classify(texts))
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from material_classifier import KeywordMatcher, classify_rule_based, classify_series
+
+MATCHER = KeywordMatcher()
+
+
+def matched(text):
+    return [MATCHER.entries[keyword_id] for keyword_id in MATCHER.match(text)]
+
+
+@pytest.mark.parametrize('text', ['called competitive', 'a ledger of petitions', 'metallicity', 'polymerase'])
+def test_keywords_do_not_match_inside_words(text):
+    assert matched(text) == []
+
+
+@pytest.mark.parametrize('text, entry', [
+    ('LED arrays', ('semiconductor', 'led')),
+    ('recycled PET bottles', ('polymer', 'pet')),
+    ('a (metallic) surface', ('metal', 'metallic')),
+])
+def test_keywords_match_whole_tokens_in_any_case(text, entry):
+    assert matched(text) == [entry]
+
+
+@pytest.mark.parametrize('text', ['tandem solar cell', 'Solar-Cell efficiency', 'SOLAR  CELL'])
+def test_phrases_match_across_case_punctuation_and_spacing(text):
+    assert matched(text) == [('semiconductor', 'solar cell')]
+
+
+@pytest.mark.parametrize('text', ['solar cells', 'solar thermal cell', 'cell solar'])
+def test_phrases_need_all_their_words_in_order(text):
+    assert matched(text) == []
+
+
+def test_phrases_score_one_point_per_word():
+    scores, keywords = MATCHER.scores('carbon nanotube')
+    assert scores == {'nano_materials': 3}
+    assert keywords == {'nano_materials': ['nanotube', 'carbon nanotube']}
+
+
+def test_substring_hits_no_longer_classify():
+    assert classify_rule_based('called competitive') == ('others', 0.0, "No material keywords detected")
+    assert classify_rule_based('LED arrays')[0] == 'semiconductor'
+
+
+EDGE_CASES = [
+    '',
+    '   ',
+    'a study of nothing in particular',
+    'called competitive',
+    'polymer',
+    'polymer metal ceramic',
+    'thin film transistor with silicon nanowires and graphene',
+]
+
+
+@pytest.mark.parametrize('threshold', [0.4, 0.85])
+def test_classify_series_matches_classify_rule_based(demo_texts, threshold):
+    texts = pd.concat([demo_texts, pd.Series(EDGE_CASES)], ignore_index=True)
+    result = classify_series(texts, threshold)
+    for text, (category, confidence, explanation) in zip(texts, result.itertuples(index=False)):
+        expected = classify_rule_based(text, threshold)
+        assert (category, explanation) == (expected[0], expected[2]), text
+        assert confidence == pytest.approx(expected[1]), text
+
+
+def test_classify_series_keeps_the_index():
+    texts = pd.Series(['polymer blend', 'steel alloy'], index=[7, 3])
+    assert classify_series(texts).index.tolist() == [7, 3]
+
+
+def test_match_matrix_marks_whole_token_matches_only():
+    matches = MATCHER.match_matrix(pd.Series(['LED arrays', 'called competitive', 'tandem solar cell']))
+    assert [sorted(MATCHER.entries[i][1] for i in row.indices) for row in matches] == [['led'], [], ['solar cell']]
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from material_classifier import classify_series, prepare_texts
+from parallel_classify import ShardPool
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ShardPool(workers=2, min_shard_rows=50) as pool:
+        yield pool
+
+
+@pytest.fixture
+def texts(demo_texts):
+    # Shuffled, with a non-default index, so order mistakes show
+    shuffled = demo_texts.sample(frac=1, random_state=3)
+    return shuffled.set_axis(shuffled.index * 10 + 1)
+
+
+def test_texts_are_split_into_several_shards(pool, texts):
+    assert len(pool.shards(texts)) > 2
+
+
+def test_classify_series_keeps_input_order(pool, texts):
+    pd.testing.assert_frame_equal(pool.classify_series(texts, 0.6), classify_series(texts, 0.6))
+
+
+def test_prepare_texts_keeps_row_order(pool, texts):
+    df = pd.DataFrame({'title': texts, 'keywords': ['["alloy", "steel"]', '', None, 'oxide'] * (len(texts) // 4)
+                       + [''] * (len(texts) % 4)}, index=texts.index)
+    pd.testing.assert_series_equal(pool.prepare_texts(df), prepare_texts(df))
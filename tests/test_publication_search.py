@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from publication_search import PublicationIndex, tokenize
+
+FIELDS = pd.DataFrame({
+    'Title': ['Polymer blends for flexible LEDs', 'Polymerization kinetics', 'Steel fatigue under load',
+              'LiFePO<sub>4</sub> cathodes', 'Blended steel and polymer composites', None],
+    # Interned reasons load as a categorical with missing values for keyword matches
+    'Reason': pd.Categorical([None, None, 'fatigue of steel', 'No material keywords detected', None,
+                              'No text content found']),
+    'Keywords': ['polymer led', 'polymerization', '', '', 'steel polymer', ''],
+}, index=[10, 11, 12, 13, 14, 15])
+
+
+def naive_search(fields, query):
+    """Rows where every query term starts some word of some field"""
+    words = fields.astype(object).fillna('').astype(str).apply(lambda row: set(tokenize(' '.join(row))), axis=1)
+    terms = tokenize(query)
+    return {label for label, row_words in words.items()
+            if all(any(word.startswith(term) for word in row_words) for term in terms)}
+
+
+@pytest.mark.parametrize('query', ['polymer', 'poly', 'POLY steel', 'steel fatigue', 'blend', 'led', 'lifepo4',
+                                   'keywords', 'polymer fatigue', 'content', 'led polymerization', 'xyz', 'b'])
+def test_search_matches_every_term_as_a_word_prefix(query):
+    index = PublicationIndex(FIELDS)
+    assert set(index.search(query)) == naive_search(FIELDS, query)
+
+
+def test_exact_word_hits_rank_first():
+    results = PublicationIndex(FIELDS).search('polymer')
+    assert results[-1] == 11  # only "polymerization", a prefix hit
+
+
+def test_empty_query_means_no_filter():
+    assert PublicationIndex(FIELDS).search('  ,; ') is None
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from material_classifier import MATERIAL_KEYWORDS, classify_series, score_series
+from threshold_simulator import rule_based_labels, simulate
+
+
+@pytest.mark.parametrize('threshold', [0.4, 0.6])
+def test_replayed_labels_equal_classify_series(demo_texts, threshold):
+    confidence, labels = rule_based_labels(score_series(demo_texts).to_numpy(float), list(MATERIAL_KEYWORDS),
+                                           threshold)
+    expected = classify_series(demo_texts, threshold)
+    assert labels.tolist() == expected['category'].tolist()
+    np.testing.assert_allclose(confidence, expected['confidence'])
+
+
+def test_simulate_equals_a_brute_force_sweep():
+    rng = np.random.default_rng(5)
+    categories = ['polymer', 'metal', 'ceramic']
+    scores = rng.integers(0, 4, (300, 3)).astype(float)
+    ai_labels = np.where(rng.random(300) < 0.6, rng.choice(categories + ['others'], 300), None).astype(object)
+    api_thresholds = [0.3, 0.5, 0.75, 1.0]
+
+    result = simulate(scores, categories, ai_labels, api_thresholds, others_thresholds=(0.4, 0.6))
+
+    for row in result.itertuples():
+        confidence, labels = rule_based_labels(scores, categories, row.others_threshold)
+        to_api = confidence < row.api_threshold
+        labelled = pd.notna(ai_labels)
+        kept = labelled & ~to_api
+        assert row.api_calls == to_api.sum()
+        assert row.agreement == pytest.approx(((to_api | (labels == ai_labels)) & labelled).sum() / labelled.sum())
+        assert row.rule_agreement == pytest.approx((labels == ai_labels)[kept].mean())
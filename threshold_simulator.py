@@ -0,0 +1,142 @@
+"""Replay stored rule-based scores to tune the classification thresholds.
+
+classify_publications.py keeps every publication's raw keyword score per
+category ("Score <category>" columns) and any cached generative label ("AI
+Category") in its output. From those, both thresholds can be swept over a
+whole grid without re-running the pipeline or paying for API calls:
+
+- others threshold: rule-based confidence below it becomes 'others'
+  (the threshold=0.4 of classify_rule_based)
+- API threshold: rule-based confidence below it is sent to the generative
+  API (CONFIDENCE_THRESHOLD = 0.85 in classify_publications.py)
+
+For every pair it reports the API-call count, projected cost and time, and
+agreement with the cached generative labels.
+
+    python threshold_simulator.py --api-thresholds 0.5 0.95 0.05 --others-thresholds 0.3 0.4 0.5
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from classification_store import (AI_CATEGORY, CSV_PATH, SCORE_PREFIX, available_columns, load_classifications,
+                                  publication_keys, score_columns)
+from pipeline_metrics import DEFAULT_METRICS, load_metrics
+
+# USD per million prompt / completion tokens
+TOKEN_PRICES = {'gpt-4o-mini': (0.15, 0.60)}
+
+# Used when no run metrics exist: $0.39 to send all 773 publications to the API,
+# 8 minutes for the 263 calls of the original notebook run
+DEFAULT_COST_PER_CALL = 0.39 / 773
+DEFAULT_SECONDS_PER_CALL = 8 * 60 / 263
+
+
+def load_scores(csv_path=CSV_PATH):
+    """Score matrix, category names and cached generative labels of the stored output"""
+    available = available_columns(csv_path)
+    columns = score_columns(available)
+    if not columns:
+        return None
+    has_ai = AI_CATEGORY in available
+    key_columns = [c for c in ['DOI', 'Title'] if c in available]
+    df = load_classifications(columns + ([AI_CATEGORY] if has_ai else []) + key_columns, csv_path)
+    # Rows written before scores were stored cannot be replayed
+    df = df.dropna(subset=columns)
+    # The pipeline classifies a paper shared by several faculty once
+    keys = publication_keys(df['DOI'] if 'DOI' in df.columns else None, df['Title'])
+    df = df[~pd.Series(keys).duplicated().to_numpy()]
+    scores = df[columns].to_numpy(dtype=np.float64)
+    ai_labels = df[AI_CATEGORY].astype(object).to_numpy() if has_ai else np.full(len(df), None, dtype=object)
+    return scores, [c[len(SCORE_PREFIX):] for c in columns], ai_labels
+
+
+def rule_based_labels(scores, categories, others_threshold=0.4):
+    """Confidence and category classify_rule_based would assign from raw scores"""
+    total = scores.sum(axis=1)
+    best = scores.argmax(axis=1)
+    confidence = np.divide(scores[np.arange(len(scores)), best], total,
+                           out=np.zeros(len(scores)), where=total > 0)
+    labels = np.asarray(categories, dtype=object)[best]
+    labels[(total == 0) | (confidence < others_threshold)] = 'others'
+    return confidence, labels
+
+
+def call_costs(metrics=None):
+    """Cost (USD) and seconds per generative API call, from the last run when available"""
+    counts = (metrics or {}).get('counts', {})
+    calls = counts.get('api_calls', 0)
+    if not calls:
+        return DEFAULT_COST_PER_CALL, DEFAULT_SECONDS_PER_CALL
+    prompt_price, completion_price = TOKEN_PRICES.get(counts.get('model'), TOKEN_PRICES['gpt-4o-mini'])
+    cost = (counts.get('prompt_tokens', 0) * prompt_price + counts.get('completion_tokens', 0) * completion_price) / 1e6
+    seconds = metrics['stages'].get('generative', 0.0)
+    return cost / calls or DEFAULT_COST_PER_CALL, seconds / calls or DEFAULT_SECONDS_PER_CALL
+
+
+def simulate(scores, categories, ai_labels, api_thresholds, others_thresholds=(0.4,),
+             cost_per_call=DEFAULT_COST_PER_CALL, seconds_per_call=DEFAULT_SECONDS_PER_CALL):
+    """API calls, cost, time and agreement for every (others, API) threshold pair.
+
+    agreement is measured on the publications that have a cached generative
+    label: API-routed ones take that label, the rest keep the rule-based one.
+    rule_agreement is the same restricted to publications kept rule-based.
+    """
+    api_thresholds = np.asarray(api_thresholds, dtype=float)
+    labelled = pd.notna(ai_labels)
+    n_labelled = int(labelled.sum())
+    rows = []
+    for others_threshold in others_thresholds:
+        confidence, labels = rule_based_labels(scores, categories, others_threshold)
+        api_calls = np.searchsorted(np.sort(confidence), api_thresholds, side='left')
+
+        # Labelled publications in confidence order; those at or above a threshold stay rule-based
+        order = np.argsort(confidence[labelled], kind='stable')
+        labelled_confidence = confidence[labelled][order]
+        agrees = (labels[labelled] == ai_labels[labelled])[order]
+        agree_above = np.concatenate([np.cumsum(agrees[::-1])[::-1], [0]])
+        first_kept = np.searchsorted(labelled_confidence, api_thresholds, side='left')
+        kept = n_labelled - first_kept
+        kept_agree = agree_above[first_kept]
+
+        rows.append(pd.DataFrame({
+            'others_threshold': others_threshold,
+            'api_threshold': api_thresholds.round(4),
+            'api_calls': api_calls,
+            'api_share': api_calls / max(len(scores), 1),
+            'projected_cost': api_calls * cost_per_call,
+            'projected_minutes': api_calls * seconds_per_call / 60,
+            'agreement': (first_kept + kept_agree) / max(n_labelled, 1) if n_labelled else np.nan,
+            'rule_agreement': np.divide(kept_agree, kept, out=np.full(len(kept), np.nan), where=kept > 0),
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep classification thresholds over stored scores")
+    parser.add_argument('--output', default=CSV_PATH, help="Classification output written by classify_publications.py")
+    parser.add_argument('--metrics', default=DEFAULT_METRICS, help="Run metrics used for per-call cost and time")
+    parser.add_argument('--api-thresholds', type=float, nargs=3, default=[0.5, 0.95, 0.05],
+                        metavar=('START', 'STOP', 'STEP'))
+    parser.add_argument('--others-thresholds', type=float, nargs='+', default=[0.4])
+    args = parser.parse_args()
+
+    loaded = load_scores(args.output)
+    if loaded is None:
+        print(f"❌ {args.output} has no stored scores - re-run classify_publications.py first")
+        return
+    scores, categories, ai_labels = loaded
+    cost_per_call, seconds_per_call = call_costs(load_metrics(args.metrics))
+    start, stop, step = args.api_thresholds
+    api_thresholds = np.round(np.arange(start, stop + step / 2, step), 4)
+
+    results = simulate(scores, categories, ai_labels, api_thresholds, args.others_thresholds,
+                       cost_per_call, seconds_per_call)
+    print(f"📊 {len(scores)} publications, {int(pd.notna(ai_labels).sum())} with cached generative labels "
+          f"(${cost_per_call:.5f} and {seconds_per_call:.2f}s per API call)\n")
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == '__main__':
+    main()